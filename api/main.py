@@ -1,45 +1,80 @@
 # main.py
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
 from src.api.routes import health, transcribe
+from src.api.uploads import UploadSizeLimitMiddleware, shutdown_fs_pool
 from src.config.config import (  # Alterado de Config para AppConfig
     AppConfig,
     get_settings,
 )
 from src.core.logger_config import get_logger, setup_global_logging
 from src.services.transcription import TranscriptionService
+from src.services.transcription_dispatcher import TranscriptionDispatcher
 
 # Configura o logger global
 setup_global_logging(log_file="app.log")
 logger = get_logger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    service: TranscriptionService = app.state.transcription_service
+    try:
+        # Carrega os modelos antes de aceitar requisições, fora do event loop
+        await asyncio.to_thread(service.load_models)
+    except Exception as e:
+        logger.error(f"Erro ao pré-carregar modelos (serão carregados sob demanda): {e}")
+    dispatcher = TranscriptionDispatcher(service, workers=service.config.transcription_workers)
+    dispatcher.start()
+    app.state.transcription_dispatcher = dispatcher
+    yield
+    await dispatcher.stop()
+    shutdown_fs_pool()
+    service.unload()
+
 def create_app() -> FastAPI:
     app = FastAPI(
         title="API de Transcrição de Áudio",
         description="API para transcrição de áudio usando WhisperX",
         version="1.0.0",
         docs_url="/docs",
-        redoc_url="/redoc"
-    )
-
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=["*"],
-        allow_credentials=True,
-        allow_methods=["*"],
-        allow_headers=["*"],
+        redoc_url="/redoc",
+        lifespan=lifespan
     )
 
     try:
         config = AppConfig.from_env()
         service = TranscriptionService(config)
         app.state.transcription_service = service
+        transcribe.ensure_upload_dirs(config)
         logger.info(f"Configuração carregada: VERSION_MODEL={config.version_model}, FORCE_CPU={config.force_cpu}")
     except Exception as e:
         logger.error(f"Erro ao carregar configuração: {str(e)}")
         raise
 
+    # Comprime respostas maiores (downloads de transcrições, listagens); as
+    # consultas de status, pequenas, seguem sem compressão
+    app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+    # Rejeita uploads grandes demais antes de ler o corpo da requisição
+    app.add_middleware(
+        UploadSizeLimitMiddleware,
+        limits={f"/transcribe{path}": limit for path, limit in transcribe.upload_size_limits(config).items()}
+    )
+
+    # Adicionado por último para envolver os demais (inclusive as respostas 413)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
     # Adiciona as rotas
     app.include_router(transcribe.router, prefix="/transcribe", tags=["transcription"])
     app.include_router(health.router, prefix="/health", tags=["health"])
@@ -49,11 +84,16 @@ def create_app() -> FastAPI:
 app = create_app()
 
 if __name__ == "__main__":
+    import sys
+
     import uvicorn
     uvicorn.run(
         "main:app",
         host="0.0.0.0", 
         port=8000,
         reload=True,
-        reload_dirs=["src/"]
+        reload_dirs=["src/"],
+        loop="asyncio" if sys.platform == "win32" else "uvloop",  # uvloop não suporta Windows
+        http="httptools",
+        access_log=False
     )
\ No newline at end of file
@@ -2,11 +2,15 @@
 """
 Script para rodar a aplicação localmente sem Docker
 """
+import hashlib
 import os
 import sys
 import subprocess
 from pathlib import Path
 
+# Hash do requirements.txt já instalado, guardado no próprio ambiente Python
+_REQUIREMENTS_HASH_FILE = Path(sys.prefix) / ".requirements.sha256"
+
 def check_python_version():
     """Verifica se a versão do Python é compatível"""
     if sys.version_info < (3, 8):
@@ -27,13 +31,22 @@ def create_directories():
         print(f"✅ Diretório criado: {directory}")
 
 def install_dependencies():
-    """Instala as dependências Python"""
+    """Instala as dependências Python se o requirements.txt mudou"""
+    requirements_hash = hashlib.sha256(Path("requirements.txt").read_bytes()).hexdigest()
+    if _REQUIREMENTS_HASH_FILE.exists() and _REQUIREMENTS_HASH_FILE.read_text().strip() == requirements_hash:
+        print("✅ Dependências já instaladas (requirements.txt sem alterações)")
+        return
+    
     print("📦 Instalando dependências...")
     
     try:
         subprocess.run([
             sys.executable, "-m", "pip", "install", "-r", "requirements.txt"
         ], check=True)
+        try:
+            _REQUIREMENTS_HASH_FILE.write_text(requirements_hash)
+        except OSError:
+            pass  # Ambiente sem permissão de escrita: apenas não guarda o cache
         print("✅ Dependências instaladas com sucesso")
     except subprocess.CalledProcessError as e:
         print(f"❌ Erro ao instalar dependências: {e}")
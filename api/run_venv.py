@@ -2,16 +2,27 @@
 """
 Script para rodar a aplicação com ambiente virtual
 """
+import functools
+import hashlib
 import os
 import sys
 import subprocess
 import venv
-from pathlib import Path
+
+# Caminhos dos executáveis do venv, resolvidos uma única vez
+if sys.platform == "win32":
+    _VENV_PY = "venv/Scripts/python.exe"
+    _VENV_PIP = "venv/Scripts/pip.exe"
+else:
+    _VENV_PY = "venv/bin/python"
+    _VENV_PIP = "venv/bin/pip"
+
+# Hash do requirements.txt da última instalação bem-sucedida
+_REQUIREMENTS_HASH_FILE = "venv/.requirements.sha256"
 
 def check_venv():
     """Verifica se o ambiente virtual existe"""
-    venv_path = Path("venv")
-    if not venv_path.exists():
+    if not os.path.isdir("venv"):
         print("🐍 Ambiente virtual não encontrado")
         print("📦 Criando ambiente virtual...")
         venv.create("venv", with_pip=True)
@@ -21,20 +32,31 @@ def check_venv():
 
 def get_venv_python():
     """Retorna o caminho do Python do ambiente virtual"""
-    if sys.platform == "win32":
-        return "venv/Scripts/python.exe"
-    else:
-        return "venv/bin/python"
+    return _VENV_PY
 
 def get_venv_pip():
     """Retorna o caminho do pip do ambiente virtual"""
-    if sys.platform == "win32":
-        return "venv/Scripts/pip.exe"
-    else:
-        return "venv/bin/pip"
+    return _VENV_PIP
+
+def _requirements_hash() -> str:
+    """Hash do requirements.txt combinado com a versão do Python do venv"""
+    digest = hashlib.sha256()
+    with open("requirements.txt", "rb") as f:
+        digest.update(f.read())
+    if os.path.isfile("venv/pyvenv.cfg"):
+        with open("venv/pyvenv.cfg", "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
 
 def install_dependencies():
     """Instala as dependências no ambiente virtual"""
+    requirements_hash = _requirements_hash()
+    if os.path.isfile(_REQUIREMENTS_HASH_FILE):
+        with open(_REQUIREMENTS_HASH_FILE) as f:
+            if f.read().strip() == requirements_hash:
+                print("✅ Dependências já instaladas (requirements.txt sem alterações)")
+                return
+    
     print("📦 Instalando dependências no ambiente virtual...")
     
     pip_path = get_venv_pip()
@@ -45,6 +67,8 @@ def install_dependencies():
         
         # Instalar dependências
         subprocess.run([pip_path, "install", "-r", "requirements.txt"], check=True)
+        with open(_REQUIREMENTS_HASH_FILE, "w") as f:
+            f.write(requirements_hash)
         print("✅ Dependências instaladas com sucesso")
     except subprocess.CalledProcessError as e:
         print(f"❌ Erro ao instalar dependências: {e}")
@@ -52,23 +76,33 @@ def install_dependencies():
 
 def create_directories():
     """Cria os diretórios necessários"""
-    directories = [
+    directories = (
         "public/audios",
         "public/transcriptions", 
         "logs"
-    ]
+    )
     
     for directory in directories:
-        Path(directory).mkdir(parents=True, exist_ok=True)
+        os.makedirs(directory, exist_ok=True)
         print(f"✅ Diretório criado: {directory}")
 
-def check_ffmpeg():
-    """Verifica se o FFmpeg está instalado"""
+@functools.lru_cache(maxsize=1)
+def _ffmpeg_available() -> bool:
+    """Executa `ffmpeg -version` uma única vez por processo"""
     try:
         subprocess.run(["ffmpeg", "-version"], 
                       capture_output=True, check=True)
-        print("✅ FFmpeg encontrado")
+        return True
     except (subprocess.CalledProcessError, FileNotFoundError):
+        return False
+
+def check_ffmpeg(refresh: bool = False):
+    """Verifica se o FFmpeg está instalado"""
+    if refresh:
+        _ffmpeg_available.cache_clear()
+    if _ffmpeg_available():
+        print("✅ FFmpeg encontrado")
+    else:
         print("❌ FFmpeg não encontrado")
         print("📋 Instale o FFmpeg:")
         print("   Ubuntu/Debian: sudo apt install ffmpeg")
@@ -78,8 +112,8 @@ def check_ffmpeg():
 
 def check_env_file():
     """Verifica se o arquivo .env existe"""
-    env_file = Path(".env")
-    if not env_file.exists():
+    env_file = ".env"
+    if not os.path.isfile(env_file):
         print("⚠️  Arquivo .env não encontrado")
         print("📝 Criando arquivo .env com configurações padrão...")
         
@@ -119,8 +153,9 @@ def run_application():
         print("🔍 Health check: http://localhost:8000/health")
         print("⏹️  Para parar: Ctrl+C")
         
-        # Executar a aplicação usando o Python do venv com uvicorn e hot reload
-        subprocess.run([
+        # Substitui este processo pelo Python do venv (execv), evitando manter
+        # dois interpretadores vivos durante toda a execução do servidor
+        args = [
             python_path, "-m", "uvicorn", "main:app",
             "--host", "0.0.0.0",
             "--port", "8000",
@@ -132,7 +167,9 @@ def run_application():
             "--reload-exclude", "*.log",
             "--reload-exclude", "venv/",
             "--reload-exclude", ".env"
-        ])
+        ]
+        sys.stdout.flush()
+        os.execv(python_path, args)
         
     except KeyboardInterrupt:
         print("\n👋 Aplicação encerrada")
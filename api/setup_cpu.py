@@ -4,7 +4,6 @@ Script para configurar ambiente para CPU e corrigir problemas
 """
 import os
 import sys
-from pathlib import Path
 
 def setup_cpu_environment():
     """Configura o ambiente para usar CPU"""
@@ -23,21 +22,21 @@ def setup_cpu_environment():
 
 def create_directories():
     """Cria diretórios necessários"""
-    directories = [
+    directories = (
         "public/audios",
         "public/transcriptions", 
         "logs"
-    ]
+    )
     
     for directory in directories:
-        Path(directory).mkdir(parents=True, exist_ok=True)
+        os.makedirs(directory, exist_ok=True)
         print(f"✅ Diretório criado: {directory}")
 
 def check_env_file():
     """Verifica e atualiza arquivo .env"""
-    env_file = Path(".env")
+    env_file = ".env"
     
-    if env_file.exists():
+    if os.path.isfile(env_file):
         # Ler conteúdo atual
         with open(env_file, 'r') as f:
             content = f.read()
@@ -68,9 +67,12 @@ def run_application():
     """Executa a aplicação"""
     print("🚀 Iniciando aplicação com CPU...")
     
+    # Reload duplica o processo (supervisor + worker); só ativa se pedido
+    reload = os.getenv("UVICORN_RELOAD", "false").lower() == "true"
+    
     try:
-        # Importar e executar a aplicação
-        from main import app
+        # O uvicorn importa a aplicação por "main:app"; importá-la aqui faria o
+        # supervisor (reload/workers) montar a app inteira à toa
         import uvicorn
         
         print("🌐 Servidor iniciado em: http://localhost:8000")
@@ -79,10 +81,14 @@ def run_application():
         print("⏹️  Para parar: Ctrl+C")
         
         uvicorn.run(
-            app, 
+            "main:app", 
             host="0.0.0.0", 
             port=8000, 
-            reload=True,
+            reload=reload,
+            workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+            loop="asyncio" if sys.platform == "win32" else "uvloop",  # uvloop não suporta Windows
+            http="httptools",
+            access_log=False,
             log_level="info"
         )
         
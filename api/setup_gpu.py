@@ -7,10 +7,25 @@ import sys
 import subprocess
 from pathlib import Path
 
+# Multiplicação de matrizes usada no benchmark de test_gpu
+_BENCH_SIZE = 4096
+_BENCH_ITERATIONS = 10
+_MIN_TFLOPS = 1.0
+
+_torch = None
+
+def _get_torch():
+    """Importa o PyTorch uma única vez (o import pode falhar antes da instalação)"""
+    global _torch
+    if _torch is None:
+        import torch
+        _torch = torch
+    return _torch
+
 def check_gpu():
     """Verifica se a GPU está disponível"""
     try:
-        import torch
+        torch = _get_torch()
         if torch.cuda.is_available():
             print(f"✅ GPU detectada: {torch.cuda.get_device_name()}")
             print(f"✅ CUDA version: {torch.version.cuda}")
@@ -103,23 +118,42 @@ LOG_FILE=./logs/app.log
         print("✅ Arquivo .env criado")
 
 def test_gpu():
-    """Testa se a GPU está funcionando"""
+    """Testa se a GPU está funcionando e mede o throughput de um matmul FP16"""
     print("🧪 Testando GPU...")
     
     try:
-        import torch
+        torch = _get_torch()
         
-        # Teste básico de GPU
-        if torch.cuda.is_available():
-            device = torch.device("cuda")
-            x = torch.randn(3, 3).to(device)
-            y = torch.randn(3, 3).to(device)
-            z = torch.mm(x, y)
-            print("✅ Teste de GPU bem-sucedido!")
-            return True
-        else:
+        if not torch.cuda.is_available():
             print("❌ GPU não disponível para teste")
             return False
+        
+        a = torch.randn(_BENCH_SIZE, _BENCH_SIZE, device="cuda", dtype=torch.float16)
+        b = torch.randn(_BENCH_SIZE, _BENCH_SIZE, device="cuda", dtype=torch.float16)
+        
+        # Aquecimento: inicialização do contexto e escolha dos kernels
+        for _ in range(3):
+            torch.mm(a, b)
+        torch.cuda.synchronize()
+        
+        start = torch.cuda.Event(enable_timing=True)
+        end = torch.cuda.Event(enable_timing=True)
+        start.record()
+        for _ in range(_BENCH_ITERATIONS):
+            torch.mm(a, b)
+        end.record()
+        torch.cuda.synchronize()
+        
+        seconds = start.elapsed_time(end) / 1000
+        tflops = 2 * _BENCH_SIZE ** 3 * _BENCH_ITERATIONS / seconds / 1e12
+        print(f"📊 Matmul FP16 {_BENCH_SIZE}x{_BENCH_SIZE}: {tflops:.1f} TFLOPS")
+        
+        if tflops < _MIN_TFLOPS:
+            print(f"❌ Desempenho abaixo de {_MIN_TFLOPS:.0f} TFLOPS (possível incompatibilidade driver/CUDA)")
+            return False
+        
+        print("✅ Teste de GPU bem-sucedido!")
+        return True
     except Exception as e:
         print(f"❌ Erro no teste de GPU: {e}")
         return False
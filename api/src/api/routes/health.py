@@ -1,12 +1,19 @@
 # src/api/routes/health.py
-from fastapi import APIRouter
+import json
+import logging
+
+from fastapi import APIRouter, Response
 
 from src.core.logger_config import get_logger
 
 router = APIRouter()
 logger = get_logger(__name__)
 
+# Corpo da resposta serializado uma única vez
+_HEALTH_BODY = json.dumps({"status": "ok"}).encode()
+
 @router.get("")
 async def health_check():
-    logger.debug("Verificação de saúde realizada")
-    return {"status": "ok"}
\ No newline at end of file
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Verificação de saúde realizada")
+    return Response(content=_HEALTH_BODY, media_type="application/json")
@@ -1,14 +1,28 @@
+import asyncio
+import functools
+import hashlib
+import logging
 import os
 import shutil
-from datetime import datetime
-from pathlib import Path
-from typing import List
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile
-from fastapi.encoders import jsonable_encoder
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, UploadFile, status
+from fastapi.responses import FileResponse, JSONResponse, Response
 
-from src.config.config import get_settings
+from src.api.uploads import (
+    allowed_types_str,
+    discard_kept_upload,
+    extract_kept_upload,
+    extract_upload_audio,
+    is_audio_upload_allowed,
+    keep_upload,
+    make_task_dir,
+    new_task_id,
+    run_fs,
+    save_upload,
+)
+from src.config.config import AppConfig, get_settings
 from src.core.logger_config import get_logger
 from src.models.schemas import (
     TranscriptionListResponse,
@@ -18,7 +32,8 @@ from src.models.schemas import (
     BatchUploadResponse,
     BatchUploadTask,
 )
-from src.services.transcription import TranscriptionService
+from src.services.transcription import TranscriptionService, TranscriptionVariant
+from src.services.transcription_dispatcher import TranscriptionDispatcher, TranscriptionJob
 from src.services.video_extractor import VideoAudioExtractor
 from src.services.video_frame_extractor import VideoFrameExtractor
 
@@ -26,20 +41,123 @@ logger = get_logger(__name__)
 
 router = APIRouter()
 
-def get_transcription_service():
-    settings = get_settings()
-    return TranscriptionService(settings)
+# Limite de tamanho dos uploads de vídeo
+MAX_VIDEO_SIZE = 500 * 1024 * 1024
+
+# Arquivos por lote (limite menor para vídeos, que são maiores)
+MAX_BATCH_AUDIO_FILES = 10
+MAX_BATCH_VIDEO_FILES = 5
+
+# Extratores sem estado por requisição, compartilhados por todos os handlers
+video_audio_extractor = VideoAudioExtractor()
+video_frame_extractor = VideoFrameExtractor()
+
+# Arquivos de um lote gravados em disco ao mesmo tempo
+BATCH_UPLOAD_CONCURRENCY = 4
+
+# Extrações de áudio (FFmpeg) simultâneas de um lote de vídeos: metade dos
+# núcleos, já que cada FFmpeg usa até VideoAudioExtractor.FFMPEG_THREADS threads
+BATCH_EXTRACT_CONCURRENCY = max(1, (os.cpu_count() or 2) // 2)
+
+# JSON já serializado de cada tarefa consultada. As tarefas são imutáveis
+# (update_task cria uma nova instância), então a entrada vale enquanto a
+# instância guardada for a mesma do serviço. LRU limitado a
+# STATUS_CACHE_SIZE tarefas, para não guardar toda tarefa já consultada
+STATUS_CACHE_SIZE = 1024
+_STATUS_CACHE: "OrderedDict[str, Tuple[TranscriptionTask, bytes]]" = OrderedDict()
+
+class TranscriptFileResponse(FileResponse):
+    """
+    FileResponse com blocos maiores: transcrições em JSON com timestamps por
+    palavra chegam a alguns MB. A compressão fica com o GZipMiddleware da app
+    """
+    chunk_size = 256 * 1024
+
+# Diretório de saída das sequências de frames
+SEQUENCIES_DIR = os.path.join("public", "sequencies")
+
+def upload_size_limits(config: AppConfig) -> Dict[str, int]:
+    """Tamanho máximo do corpo de cada rota de upload, relativo ao prefixo do router"""
+    return {
+        "": config.max_file_size,
+        "/": config.max_file_size,
+        "/extract-audio": MAX_VIDEO_SIZE,
+        "/extract-frames": MAX_VIDEO_SIZE,
+        "/batch-audio": MAX_BATCH_AUDIO_FILES * config.max_file_size,
+        "/batch-video": MAX_BATCH_VIDEO_FILES * MAX_VIDEO_SIZE,
+    }
+
+def get_transcription_service(request: Request) -> TranscriptionService:
+    # Reutiliza o serviço criado em create_app, com os modelos já carregados
+    service = getattr(request.app.state, "transcription_service", None)
+    if service is None:
+        service = TranscriptionService(get_settings())
+        request.app.state.transcription_service = service
+    return service
+
+async def get_transcription_dispatcher(request: Request) -> TranscriptionDispatcher:
+    # Iniciado no lifespan; criado aqui apenas se o app subiu sem ele
+    dispatcher = getattr(request.app.state, "transcription_dispatcher", None)
+    if dispatcher is None:
+        service = get_transcription_service(request)
+        dispatcher = TranscriptionDispatcher(service, workers=service.config.transcription_workers)
+        dispatcher.start()
+        request.app.state.transcription_dispatcher = dispatcher
+    return dispatcher
+
+def _client_key(request: Request) -> str:
+    """Chave de fila justa do dispatcher: o endereço do cliente"""
+    return request.client.host if request.client else ""
+
+@functools.lru_cache(maxsize=8)
+def _videos_dir(audios_dir: str) -> str:
+    """Diretório dos vídeos enviados, irmão do diretório de áudios"""
+    return os.path.join(os.path.dirname(os.path.normpath(audios_dir)), "videos")
+
+def ensure_upload_dirs(config: AppConfig):
+    """Cria os diretórios fixos de upload uma vez, na inicialização da API"""
+    for directory in (config.audios_dir, _videos_dir(config.audios_dir), SEQUENCIES_DIR):
+        os.makedirs(directory, exist_ok=True)
+
+async def _validate_audio_upload(file: UploadFile, config: AppConfig):
+    """
+    Valida nome, tipo e tamanho informado de um upload de áudio. O limite de
+    tamanho também é aplicado durante a gravação em disco
+    
+    Raises:
+        HTTPException: 400 para arquivo inválido ou tipo não suportado, 413 se
+            o tamanho informado exceder config.max_file_size
+    """
+    if not file.filename or not file.file:
+        raise HTTPException(
+            status_code=400,
+            detail="Arquivo de áudio inválido"
+        )
+    
+    # Validação mais flexível do tipo do arquivo (nome, content_type ou conteúdo)
+    if not await is_audio_upload_allowed(config, file):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Tipo de arquivo não suportado. Tipos permitidos: {allowed_types_str(config.allowed_extensions)}. Recebido: {file.content_type}"
+        )
+    
+    if file.size and file.size > config.max_file_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Tamanho do arquivo excede o limite de {config.max_file_size} bytes"
+        )
 
 @router.get("/test")
 async def test_endpoint():
     """Endpoint de teste para verificar se a rota está funcionando"""
     return {"message": "Endpoint de transcrição funcionando!", "status": "ok"}
 
-@router.post("", response_model=TranscriptionTask)
-@router.post("/", response_model=TranscriptionTask) 
+@router.post("", response_model=TranscriptionTask, status_code=202)
+@router.post("/", response_model=TranscriptionTask, status_code=202)
 async def transcribe_audio(
     file: UploadFile,
-    background_tasks: BackgroundTasks,
+    request: Request,
+    dispatcher: TranscriptionDispatcher = Depends(get_transcription_dispatcher),
     service: TranscriptionService = Depends(get_transcription_service),
     include_timestamps: bool = True,
     include_speaker_diarization: bool = True,
@@ -53,93 +171,26 @@ async def transcribe_audio(
     try:
         config = service.config
         
-        logger.info(f"Recebendo arquivo: {file.filename}")
-        logger.info(f"Tipo recebido: {file.content_type}")
-        logger.info(f"Tipos permitidos: {config.allowed_extensions}")
+        logger.info(f"Recebendo arquivo: {file.filename} ({file.content_type})")
         
-        # Validação do arquivo
-        if not file.filename or not file.file:
-            raise HTTPException(
-                status_code=400,
-                detail="Arquivo de áudio inválido"
-            )
+        # Toda a validação antes de qualquer E/S
+        await _validate_audio_upload(file, config)
         
-        # Validação mais flexível do tipo do arquivo
-        allowed_types = config.allowed_extensions
-        file_extension = Path(file.filename).suffix.lower()
-        
-        # Mapeamento de extensões para tipos MIME
-        extension_to_mime = {
-            '.wav': 'audio/wav',
-            '.mp3': 'audio/mp3', 
-            '.ogg': 'audio/ogg',
-            '.m4a': 'audio/m4a',
-            '.flac': 'audio/flac',
-            '.aac': 'audio/aac'
-        }
+        task_id = new_task_id()
         
-        expected_mime = extension_to_mime.get(file_extension)
+        # Cria a subpasta do áudio (o diretório base é criado na inicialização)
+        audio_subfolder = os.path.join(service.config.audios_dir, task_id)
+        await run_fs(make_task_dir, audio_subfolder)
         
-        # Aceita se o content_type está correto OU se a extensão é válida
-        if file.content_type not in allowed_types and expected_mime not in allowed_types:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Tipo de arquivo não suportado. Tipos permitidos: {', '.join(allowed_types)}. Recebido: {file.content_type}"
-            )
-        
-        # Antes da validação, precisamos ler o tamanho do arquivo
-        file_size = 0
-        file.file.seek(0, 2)  # Vai para o final do arquivo
-        file_size = file.file.tell()  # Pega a posição atual (tamanho)
-        file.file.seek(0)  # Volta para o início do arquivo
-        
-        # Validação do tamanho do arquivo
-        if file_size > config.max_file_size:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Tamanho do arquivo excede o limite de {config.max_file_size} bytes"
-            )
-    
-        # Validação do arquivo
-        if not file.filename or not file.file:
-            raise HTTPException(
-                status_code=400,
-                detail="Arquivo de áudio inválido"
-            )
-            
-        # Cria diretório base se não existir
-        os.makedirs(service.config.audios_dir, exist_ok=True)
-        
-        task_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.urandom(4).hex()}"
-        
-        # Cria subpasta para o áudio
-        audio_subfolder = Path(service.config.audios_dir) / task_id
-        audio_subfolder.mkdir(parents=True, exist_ok=True)
-        
-        audio_path = audio_subfolder / file.filename
+        audio_path = os.path.join(audio_subfolder, file.filename)
         
+        hasher = hashlib.sha256()
         try:
-            # Garantir que o arquivo está no início
-            await file.seek(0)
-            
-            # Ler o conteúdo do arquivo
-            contents = await file.read()
-            
-            logger.info(f"Arquivo lido com sucesso. Tamanho: {len(contents)} bytes")
-            
-            # Salvar o arquivo
-            with open(audio_path, "wb") as buffer:
-                buffer.write(contents)
-                
-            logger.info(f"Arquivo salvo com sucesso: {audio_path}")
-            
-            # Verificar se o arquivo foi salvo corretamente
-            if not os.path.exists(audio_path):
-                raise Exception("Arquivo não foi salvo corretamente")
-                
-            file_size = os.path.getsize(audio_path)
-            logger.info(f"Arquivo salvo com tamanho: {file_size} bytes")
+            file_size = await save_upload(file, audio_path, config.max_file_size, hasher)
+            logger.info(f"Arquivo salvo com sucesso: {audio_path} ({file_size} bytes)")
             
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Erro detalhado ao salvar arquivo: {str(e)}")
             logger.error(f"Tipo de erro: {type(e).__name__}")
@@ -148,22 +199,39 @@ async def transcribe_audio(
                 detail=f"Erro ao salvar arquivo de áudio: {str(e)}"
             )
         
-        task = service.create_task(task_id, file.filename)
+        # Mesmo áudio com as mesmas opções: reaproveita a tarefa existente
+        model = version_model or config.version_model
+        dedup_key = (
+            f"{hasher.hexdigest()}:{output_format}:{int(include_timestamps)}"
+            f"{int(include_speaker_diarization)}:{getattr(model, 'value', model)}"
+        )
+        existing = service.find_duplicate(dedup_key)
+        if existing is not None:
+            logger.info(f"Áudio já transcrito na tarefa {existing.task_id}; upload descartado")
+            await run_fs(shutil.rmtree, audio_subfolder, ignore_errors=True)
+            return Response(content=existing.model_dump_json(), media_type="application/json")
+        
+        task = service.create_task(task_id, file.filename, dedup_key)
         
-        background_tasks.add_task(
-            service.process_transcription,
+        await dispatcher.enqueue(TranscriptionJob(
             task_id=task_id,
-            audio_path=str(audio_path),
+            audio_path=audio_path,
             output_format=output_format,
             force_cpu=force_cpu if force_cpu is not None else config.force_cpu,
-            version_model=version_model or config.version_model,
+            version_model=model,
             include_timestamps=include_timestamps,
             include_speaker_diarization=include_speaker_diarization
-        )
+        ), client=_client_key(request))
         
-        serialized_task = jsonable_encoder(task)
-        return JSONResponse(status_code=202, content=serialized_task)
+        # Serializa direto para JSON, sem revalidar pelo response_model
+        return Response(
+            content=task.model_dump_json(),
+            status_code=status.HTTP_202_ACCEPTED,
+            media_type="application/json"
+        )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao processar transcrição: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -179,11 +247,22 @@ async def get_transcription_status(
     try:
         task_info = service.get_task_status(task_id)
         if task_info is None:
+            _STATUS_CACHE.pop(task_id, None)
             raise HTTPException(
                 status_code=404,
                 detail="Tarefa não encontrada"
             )
-        return task_info
+        # Polling repetido reaproveita o JSON enquanto a tarefa não muda
+        cached = _STATUS_CACHE.get(task_id)
+        if cached is None or cached[0] is not task_info:
+            cached = (task_info, task_info.model_dump_json().encode())
+            _STATUS_CACHE[task_id] = cached
+            if len(_STATUS_CACHE) > STATUS_CACHE_SIZE:
+                _STATUS_CACHE.popitem(last=False)
+        _STATUS_CACHE.move_to_end(task_id)
+        return Response(content=cached[1], media_type="application/json")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao buscar status da tarefa: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -210,16 +289,22 @@ async def download_transcription(
                 detail="Transcrição ainda não está completa"
             )
             
-        if not task_info.output_file or not os.path.exists(task_info.output_file):
+        # Um único stat: confirma a existência e é reaproveitado pelo FileResponse
+        try:
+            stat_result = await run_fs(os.stat, task_info.output_file) if task_info.output_file else None
+        except FileNotFoundError:
+            stat_result = None
+        if stat_result is None:
             raise HTTPException(
                 status_code=404,
                 detail="Arquivo de transcrição não encontrado"
             )
             
-        return FileResponse(
+        return TranscriptFileResponse(
             path=task_info.output_file,
             filename=os.path.basename(task_info.output_file),
-            media_type="text/plain"
+            media_type="text/plain",
+            stat_result=stat_result
         )
     except HTTPException:
         raise
@@ -236,10 +321,13 @@ async def list_transcriptions(
     """
     try:
         tasks = service.list_tasks()
-        return TranscriptionListResponse(
+        # As tarefas já são modelos validados: monta a resposta sem revalidar e
+        # serializa direto para JSON no pydantic-core, sem passar pelo json da stdlib
+        response = TranscriptionListResponse.model_construct(
             tasks=tasks,
             total=len(tasks)
         )
+        return Response(content=response.model_dump_json(), media_type="application/json")
     except Exception as e:
         logger.error(f"Erro ao listar transcrições: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -247,14 +335,15 @@ async def list_transcriptions(
 @router.post("/extract-audio")
 async def extract_audio_from_video(
     file: UploadFile,
-    background_tasks: BackgroundTasks,
+    request: Request,
+    dispatcher: TranscriptionDispatcher = Depends(get_transcription_dispatcher),
     service: TranscriptionService = Depends(get_transcription_service)
 ):
     """
     Extrai áudio de um arquivo de vídeo e retorna como WAV
     """
     try:
-        extractor = VideoAudioExtractor()
+        extractor = video_audio_extractor
         
         # Validação do arquivo
         if not file.filename or not file.file:
@@ -267,60 +356,34 @@ async def extract_audio_from_video(
         if not extractor.is_video_file(file.filename):
             raise HTTPException(
                 status_code=400,
-                detail=f"Formato de vídeo não suportado. Formatos suportados: {', '.join(extractor.supported_video_formats)}"
+                detail=f"Formato de vídeo não suportado. Formatos suportados: {extractor.SUPPORTED_VIDEO_FORMATS_STR}"
             )
         
-        # Validação do tamanho do arquivo
-        file.file.seek(0, 2)
-        file_size = file.file.tell()
-        file.file.seek(0)
-        
-        max_size = 500 * 1024 * 1024  # 500MB para vídeos
-        if file_size > max_size:
+        # Validação do tamanho informado pelo upload
+        if file.size and file.size > MAX_VIDEO_SIZE:
             raise HTTPException(
-                status_code=400,
-                detail=f"Tamanho do arquivo excede o limite de {max_size} bytes"
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Tamanho do arquivo excede o limite de {MAX_VIDEO_SIZE} bytes"
             )
         
-        # Cria diretórios se não existirem
-        videos_dir = Path(service.config.audios_dir).parent / "videos"
-        os.makedirs(videos_dir, exist_ok=True)
-        os.makedirs(service.config.audios_dir, exist_ok=True)
+        # Diretório criado na inicialização (ensure_upload_dirs)
+        videos_dir = _videos_dir(service.config.audios_dir)
         
         # Gera nomes únicos para os arquivos
-        task_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.urandom(4).hex()}"
-        video_path = videos_dir / f"{task_id}_{file.filename}"
+        task_id = new_task_id()
+        video_path = os.path.join(videos_dir, f"{task_id}_{file.filename}")
         
         # Cria subpasta para o áudio extraído
-        audio_subfolder = Path(service.config.audios_dir) / task_id
-        audio_subfolder.mkdir(parents=True, exist_ok=True)
+        audio_subfolder = os.path.join(service.config.audios_dir, task_id)
+        await run_fs(make_task_dir, audio_subfolder)
         
-        audio_filename = f"{Path(file.filename).stem}.wav"
-        audio_path = audio_subfolder / audio_filename
+        audio_filename = f"{os.path.splitext(file.filename)[0]}.wav"
+        audio_path = os.path.join(audio_subfolder, audio_filename)
         
         try:
-            # Salva o arquivo de vídeo temporariamente
-            contents = await file.read()
-            with open(video_path, "wb") as buffer:
-                buffer.write(contents)
-            
-            logger.info(f"Vídeo salvo: {video_path}")
-            
-            # Extrai o áudio
-            success = extractor.extract_audio(str(video_path), str(audio_path))
-            
-            if not success:
-                raise HTTPException(
-                    status_code=500,
-                    detail="Falha na extração do áudio do vídeo"
-                )
-            
-            # Remove o arquivo de vídeo temporário
-            try:
-                os.remove(video_path)
-                logger.info(f"Arquivo de vídeo temporário removido: {video_path}")
-            except Exception as e:
-                logger.warning(f"Não foi possível remover o arquivo temporário: {e}")
+            # Extrai o áudio direto do upload; o vídeo só é gravado em
+            # video_path se o FFmpeg não conseguir lê-lo sem seek
+            await extract_upload_audio(extractor, file, audio_path, video_path, MAX_VIDEO_SIZE)
             
             # Gera 4 transcrições automaticamente com diferentes configurações
             transcription_tasks = []
@@ -333,34 +396,37 @@ async def extract_audio_from_video(
                 {"timestamps": True, "diarization": True, "suffix": "completa"}
             ]
             
+            variants = []
             for config in configs:
                 transcription_task_id = f"{task_id}_{config['suffix']}"
                 task = service.create_task(transcription_task_id, audio_filename)
-                
-                # Adiciona tarefa de transcrição em background
-                background_tasks.add_task(
-                    service.process_transcription,
+                variants.append(TranscriptionVariant(
                     task_id=transcription_task_id,
-                    audio_path=str(audio_path),
-                    output_format="txt",
-                    force_cpu=service.config.force_cpu,
-                    version_model=service.config.version_model,
                     include_timestamps=config["timestamps"],
                     include_speaker_diarization=config["diarization"],
-                    base_task_id=task_id,  # Usa o task_id base para a pasta
                     transcription_suffix=config["suffix"]  # Sufixo para o nome do arquivo
-                )
+                ))
                 
                 # Adiciona o objeto TranscriptionTask completo com metadados adicionais
-                task_dict = jsonable_encoder(task)
-                task_dict.update({
+                transcription_tasks.append({
+                    **task.model_dump(mode="json"),
                     "type": config["suffix"],
                     "timestamps": config["timestamps"],
                     "diarization": config["diarization"]
                 })
-                transcription_tasks.append(task_dict)
-                
-                logger.info(f"Transcrição {config['suffix']} criada: {transcription_task_id}")
+            
+            logger.info("Transcrições criadas para %s: %s", task_id, ", ".join(c["suffix"] for c in configs))
+            
+            # Uma única inferência em background; as 4 variantes só mudam a formatação
+            await dispatcher.enqueue(TranscriptionJob(
+                task_id=task_id,
+                audio_path=audio_path,
+                output_format="txt",
+                force_cpu=service.config.force_cpu,
+                version_model=service.config.version_model,
+                base_task_id=task_id,  # Usa o task_id base para a pasta
+                variants=tuple(variants)
+            ), client=_client_key(request))
             
             # Retorna mensagem de sucesso com informações do arquivo e transcrições
             return JSONResponse(
@@ -369,8 +435,8 @@ async def extract_audio_from_video(
                     "message": "Áudio extraído com sucesso e transcrições iniciadas",
                     "audio": {
                         "filename": audio_filename,
-                        "path": str(audio_path),
-                        "size_bytes": os.path.getsize(audio_path),
+                        "path": audio_path,
+                        "size_bytes": await run_fs(os.path.getsize, audio_path),
                         "original_video": file.filename
                     },
                     "transcriptions": transcription_tasks,
@@ -385,11 +451,13 @@ async def extract_audio_from_video(
             # Limpa arquivos temporários em caso de erro
             for temp_file in [video_path, audio_path]:
                 try:
-                    if os.path.exists(temp_file):
-                        os.remove(temp_file)
+                    if await run_fs(os.path.exists, temp_file):
+                        await run_fs(os.remove, temp_file)
                 except:
                     pass
-                    
+            
+            if isinstance(e, HTTPException):
+                raise
             logger.error(f"Erro ao extrair áudio: {str(e)}")
             raise HTTPException(
                 status_code=500,
@@ -424,7 +492,7 @@ async def extract_frames_from_video(
         quality: Qualidade das imagens JPEG (1-31, menor = melhor qualidade)
     """
     try:
-        extractor = VideoFrameExtractor()
+        extractor = video_frame_extractor
         
         # Validação do arquivo
         if not file.filename or not file.file:
@@ -437,19 +505,14 @@ async def extract_frames_from_video(
         if not extractor.is_video_file(file.filename):
             raise HTTPException(
                 status_code=400,
-                detail=f"Formato de vídeo não suportado. Formatos suportados: {', '.join(extractor.supported_video_formats)}"
+                detail=f"Formato de vídeo não suportado. Formatos suportados: {extractor.SUPPORTED_VIDEO_FORMATS_STR}"
             )
         
-        # Validação do tamanho do arquivo
-        file.file.seek(0, 2)
-        file_size = file.file.tell()
-        file.file.seek(0)
-        
-        max_size = 500 * 1024 * 1024  # 500MB para vídeos
-        if file_size > max_size:
+        # Validação do tamanho informado pelo upload
+        if file.size and file.size > MAX_VIDEO_SIZE:
             raise HTTPException(
-                status_code=400,
-                detail=f"Tamanho do arquivo excede o limite de {max_size} bytes"
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Tamanho do arquivo excede o limite de {MAX_VIDEO_SIZE} bytes"
             )
         
         # Validação dos parâmetros
@@ -465,46 +528,39 @@ async def extract_frames_from_video(
                 detail="Qualidade deve estar entre 1 e 31"
             )
         
-        # Cria diretórios
-        sequencies_dir = Path("public/sequencies")
-        sequencies_dir.mkdir(parents=True, exist_ok=True)
-        
-        videos_dir = Path(service.config.audios_dir).parent / "videos"
-        videos_dir.mkdir(parents=True, exist_ok=True)
+        # Diretórios criados na inicialização (ensure_upload_dirs)
+        videos_dir = _videos_dir(service.config.audios_dir)
         
         # Gera nomes únicos
-        task_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.urandom(4).hex()}"
-        video_path = videos_dir / f"{task_id}_{file.filename}"
-        output_dir = sequencies_dir / f"{task_id}_{Path(file.filename).stem}"
+        task_id = new_task_id()
+        video_path = os.path.join(videos_dir, f"{task_id}_{file.filename}")
+        output_dir = os.path.join(SEQUENCIES_DIR, f"{task_id}_{os.path.splitext(file.filename)[0]}")
+        
+        # Salva o arquivo de vídeo temporariamente (remove o parcial se falhar)
+        file_size = await save_upload(file, video_path, MAX_VIDEO_SIZE)
+        logger.info(f"Vídeo salvo: {video_path}")
         
         try:
-            # Salva o arquivo de vídeo temporariamente
-            contents = await file.read()
-            with open(video_path, "wb") as buffer:
-                buffer.write(contents)
-            
-            logger.info(f"Vídeo salvo: {video_path}")
-            
             # Extrai os frames
             if extract_keyframes:
-                result = extractor.extract_key_frames(
-                    str(video_path),
-                    str(output_dir),
+                result = await extractor.extract_key_frames_async(
+                    video_path,
+                    output_dir,
                     format=format,
                     quality=quality
                 )
             elif interval_seconds:
-                result = extractor.extract_frames_at_intervals(
-                    str(video_path),
-                    str(output_dir),
+                result = await extractor.extract_frames_at_intervals_async(
+                    video_path,
+                    output_dir,
                     interval_seconds=interval_seconds,
                     format=format,
                     quality=quality
                 )
             else:
-                result = extractor.extract_frames(
-                    str(video_path),
-                    str(output_dir),
+                result = await extractor.extract_frames_async(
+                    video_path,
+                    output_dir,
                     fps=fps,
                     quality=quality,
                     format=format
@@ -512,14 +568,14 @@ async def extract_frames_from_video(
             
             # Remove o arquivo de vídeo temporário
             try:
-                os.remove(video_path)
+                await run_fs(os.remove, video_path)
                 logger.info(f"Arquivo de vídeo temporário removido: {video_path}")
             except Exception as e:
                 logger.warning(f"Não foi possível remover o arquivo temporário: {e}")
             
             if not result["success"]:
                 # Limpa o diretório de saída em caso de erro
-                extractor.cleanup_output_dir(str(output_dir))
+                await run_fs(extractor.cleanup_output_dir, output_dir)
                 raise HTTPException(
                     status_code=500,
                     detail=result.get("error", "Falha na extração de frames")
@@ -533,7 +589,7 @@ async def extract_frames_from_video(
                     "task_id": task_id,
                     "extraction": {
                         "frame_count": result["frame_count"],
-                        "output_dir": str(output_dir),
+                        "output_dir": output_dir,
                         "fps_extracted": result.get("fps_extracted", fps),
                         "format": format,
                         "quality": quality,
@@ -551,14 +607,14 @@ async def extract_frames_from_video(
             # Limpa arquivos temporários em caso de erro
             for temp_file in [video_path]:
                 try:
-                    if os.path.exists(temp_file):
-                        os.remove(temp_file)
+                    if await run_fs(os.path.exists, temp_file):
+                        await run_fs(os.remove, temp_file)
                 except:
                     pass
             
             # Limpa diretório de saída se foi criado
-            if os.path.exists(output_dir):
-                extractor.cleanup_output_dir(str(output_dir))
+            if await run_fs(os.path.exists, output_dir):
+                await run_fs(extractor.cleanup_output_dir, output_dir)
                     
             logger.error(f"Erro ao extrair frames: {str(e)}")
             raise HTTPException(
@@ -620,7 +676,8 @@ async def delete_tasks_database(
         logger.info(f"Arquivo tasks.json removido: {tasks_file}")
         
         # Limpa o cache em memória
-        service._tasks = {}
+        service.clear_tasks()
+        _STATUS_CACHE.clear()
         
         return {
             "message": "Arquivo tasks.json excluído com sucesso",
@@ -655,6 +712,7 @@ async def delete_transcription(
     """
     try:
         success = service.delete_task(task_id, delete_files)
+        _STATUS_CACHE.pop(task_id, None)
         if not success:
             raise HTTPException(
                 status_code=404,
@@ -694,10 +752,11 @@ async def get_task_files(
         logger.error(f"Erro ao obter informações dos arquivos: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/batch-audio", response_model=BatchUploadResponse)
+@router.post("/batch-audio", response_model=BatchUploadResponse, status_code=202)
 async def batch_upload_audio(
     files: List[UploadFile],
-    background_tasks: BackgroundTasks,
+    request: Request,
+    dispatcher: TranscriptionDispatcher = Depends(get_transcription_dispatcher),
     service: TranscriptionService = Depends(get_transcription_service),
     include_timestamps: bool = True,
     include_speaker_diarization: bool = True,
@@ -715,20 +774,19 @@ async def batch_upload_audio(
                 detail="Nenhum arquivo foi enviado"
             )
         
-        if len(files) > 10:  # Limite de arquivos por lote
+        if len(files) > MAX_BATCH_AUDIO_FILES:
             raise HTTPException(
                 status_code=400,
-                detail="Máximo de 10 arquivos por lote"
+                detail=f"Máximo de {MAX_BATCH_AUDIO_FILES} arquivos por lote"
             )
         
         # Gera ID do lote
-        batch_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.urandom(4).hex()}"
+        batch_id = new_task_id()
         
-        batch_tasks: List[BatchUploadTask] = []
         config = service.config
+        semaphore = asyncio.Semaphore(BATCH_UPLOAD_CONCURRENCY)
         
-        # Processa cada arquivo
-        for file in files:
+        async def process_one(index: int, file: UploadFile) -> BatchUploadTask:
             batch_task = BatchUploadTask(
                 filename=file.filename,
                 file_size=file.size if hasattr(file, 'size') else 0
@@ -739,53 +797,30 @@ async def batch_upload_audio(
                 if not file.filename or not file.file:
                     batch_task.error = "Arquivo inválido"
                     batch_task.status = "failed"
-                    batch_tasks.append(batch_task)
-                    continue
+                    return batch_task
                 
                 # Validação do tipo de arquivo
-                file_extension = Path(file.filename).suffix.lower()
-                extension_to_mime = {
-                    '.wav': 'audio/wav',
-                    '.mp3': 'audio/mp3', 
-                    '.ogg': 'audio/ogg',
-                    '.m4a': 'audio/m4a',
-                    '.flac': 'audio/flac',
-                    '.aac': 'audio/aac'
-                }
-                
-                expected_mime = extension_to_mime.get(file_extension)
-                allowed_types = config.allowed_extensions
-                
-                if file.content_type not in allowed_types and expected_mime not in allowed_types:
+                if not await is_audio_upload_allowed(config, file):
                     batch_task.error = f"Tipo de arquivo não suportado: {file.content_type}"
                     batch_task.status = "failed"
-                    batch_tasks.append(batch_task)
-                    continue
+                    return batch_task
                 
-                # Validação do tamanho do arquivo
-                file.file.seek(0, 2)
-                file_size = file.file.tell()
-                file.file.seek(0)
-                batch_task.file_size = file_size
-                
-                if file_size > config.max_file_size:
-                    batch_task.error = f"Arquivo muito grande: {file_size} bytes"
+                # Validação do tamanho informado pelo upload
+                if file.size and file.size > config.max_file_size:
+                    batch_task.error = f"Arquivo muito grande: {file.size} bytes"
                     batch_task.status = "failed"
-                    batch_tasks.append(batch_task)
-                    continue
+                    return batch_task
                 
                 # Cria diretório e salva arquivo
-                os.makedirs(service.config.audios_dir, exist_ok=True)
-                task_id = f"{batch_id}_{len(batch_tasks):03d}_{datetime.now().strftime('%H%M%S')}"
+                task_id = f"{batch_id}_{index:03d}"
                 
-                audio_subfolder = Path(service.config.audios_dir) / task_id
-                audio_subfolder.mkdir(parents=True, exist_ok=True)
-                audio_path = audio_subfolder / file.filename
+                audio_subfolder = os.path.join(service.config.audios_dir, task_id)
+                await run_fs(make_task_dir, audio_subfolder)
+                audio_path = os.path.join(audio_subfolder, file.filename)
                 
-                # Salva o arquivo
-                contents = await file.read()
-                with open(audio_path, "wb") as buffer:
-                    buffer.write(contents)
+                # Salva o arquivo (no máximo BATCH_UPLOAD_CONCURRENCY gravações simultâneas)
+                async with semaphore:
+                    batch_task.file_size = await save_upload(file, audio_path, config.max_file_size)
                 
                 # Cria tarefa de transcrição
                 task = service.create_task(task_id, file.filename)
@@ -793,29 +828,43 @@ async def batch_upload_audio(
                 batch_task.status = "pending"
                 
                 # Adiciona à fila de processamento em background
-                background_tasks.add_task(
-                    service.process_transcription,
+                await dispatcher.enqueue(TranscriptionJob(
                     task_id=task_id,
-                    audio_path=str(audio_path),
+                    audio_path=audio_path,
                     output_format=output_format,
                     force_cpu=force_cpu if force_cpu is not None else config.force_cpu,
                     version_model=version_model or config.version_model,
                     include_timestamps=include_timestamps,
                     include_speaker_diarization=include_speaker_diarization
-                )
-                
-                logger.info(f"Arquivo {file.filename} adicionado ao lote {batch_id} como task {task_id}")
+                ), client=_client_key(request))
                 
+            except HTTPException as e:
+                logger.error(f"Erro ao processar arquivo {file.filename}: {e.detail}")
+                batch_task.error = e.detail
+                batch_task.status = "failed"
             except Exception as e:
                 logger.error(f"Erro ao processar arquivo {file.filename}: {str(e)}")
                 batch_task.error = str(e)
                 batch_task.status = "failed"
             
-            batch_tasks.append(batch_task)
+            return batch_task
+        
+        # Processa os arquivos em paralelo, mantendo a ordem do envio
+        batch_tasks: List[BatchUploadTask] = await asyncio.gather(
+            *(process_one(i, file) for i, file in enumerate(files))
+        )
         
         # Conta arquivos processados
         successful_files = len([t for t in batch_tasks if t.status != "failed"])
         
+        # Uma linha por lote em vez de uma por arquivo
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Lote %s: %d/%d arquivos enfileirados (%s)",
+                batch_id, successful_files, len(files),
+                ", ".join(f"{t.filename}: {t.task.task_id if t.task else t.status}" for t in batch_tasks)
+            )
+        
         response = BatchUploadResponse(
             batch_id=batch_id,
             total_files=len(files),
@@ -823,7 +872,7 @@ async def batch_upload_audio(
             message=f"Lote processado: {successful_files}/{len(files)} arquivos enviados com sucesso"
         )
         
-        return JSONResponse(status_code=202, content=jsonable_encoder(response))
+        return response
         
     except HTTPException:
         raise
@@ -831,10 +880,47 @@ async def batch_upload_audio(
         logger.error(f"Erro no upload em lote: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/batch-video", response_model=BatchUploadResponse)
+async def _extract_then_transcribe(
+    service: TranscriptionService,
+    dispatcher: TranscriptionDispatcher,
+    extractions: List[Tuple[Optional[int], str, TranscriptionJob]],
+    client: str
+):
+    """
+    Extrai, depois da resposta 202, o áudio dos vídeos de um lote e enfileira
+    a transcrição de cada vídeo assim que o seu áudio fica pronto. Cada
+    extração é (descritor de keep_upload, caminho do vídeo, job)
+    """
+    semaphore = asyncio.Semaphore(min(len(extractions), BATCH_EXTRACT_CONCURRENCY))
+    
+    async def extract_one(source_fd: Optional[int], video_path: str, job: TranscriptionJob):
+        task_ids = [variant.task_id for variant in job.variants]
+        async with semaphore:
+            # Lote cancelado enquanto aguardava: não extrai
+            if not any(
+                (task := service.get_task_status(task_id)) and task.status == TranscriptionStatus.EXTRACTING
+                for task_id in task_ids
+            ):
+                await run_fs(discard_kept_upload, source_fd, video_path)
+                return
+            try:
+                success = await extract_kept_upload(video_audio_extractor, source_fd, video_path, job.audio_path)
+            except Exception as e:
+                logger.error(f"Erro ao extrair áudio de {video_path}: {e}")
+                success = False
+        
+        error = None if success else "Falha na extração do áudio do vídeo"
+        if service.finish_extraction(task_ids, error):
+            await dispatcher.enqueue(job, client=client)
+    
+    await asyncio.gather(*(extract_one(*extraction) for extraction in extractions))
+
+@router.post("/batch-video", response_model=BatchUploadResponse, status_code=202)
 async def batch_upload_video(
     files: List[UploadFile],
+    request: Request,
     background_tasks: BackgroundTasks,
+    dispatcher: TranscriptionDispatcher = Depends(get_transcription_dispatcher),
     service: TranscriptionService = Depends(get_transcription_service)
 ):
     """
@@ -847,20 +933,20 @@ async def batch_upload_video(
                 detail="Nenhum arquivo foi enviado"
             )
         
-        if len(files) > 5:  # Limite menor para vídeos (são maiores)
+        if len(files) > MAX_BATCH_VIDEO_FILES:
             raise HTTPException(
                 status_code=400,
-                detail="Máximo de 5 vídeos por lote"
+                detail=f"Máximo de {MAX_BATCH_VIDEO_FILES} vídeos por lote"
             )
         
         # Gera ID do lote
-        batch_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.urandom(4).hex()}"
+        batch_id = new_task_id()
         
-        batch_tasks: List[BatchUploadTask] = []
-        extractor = VideoAudioExtractor()
+        extractor = video_audio_extractor
+        semaphore = asyncio.Semaphore(BATCH_UPLOAD_CONCURRENCY)
+        extractions: List[Tuple[Optional[int], str, TranscriptionJob]] = []
         
-        # Processa cada arquivo
-        for file in files:
+        async def process_one(index: int, file: UploadFile) -> BatchUploadTask:
             batch_task = BatchUploadTask(
                 filename=file.filename,
                 file_size=file.size if hasattr(file, 'size') else 0
@@ -871,120 +957,115 @@ async def batch_upload_video(
                 if not file.filename or not file.file:
                     batch_task.error = "Arquivo de vídeo inválido"
                     batch_task.status = "failed"
-                    batch_tasks.append(batch_task)
-                    continue
+                    return batch_task
                 
                 # Verifica se é um arquivo de vídeo suportado
                 if not extractor.is_video_file(file.filename):
                     batch_task.error = f"Formato de vídeo não suportado"
                     batch_task.status = "failed"
-                    batch_tasks.append(batch_task)
-                    continue
-                
-                # Validação do tamanho do arquivo
-                file.file.seek(0, 2)
-                file_size = file.file.tell()
-                file.file.seek(0)
-                batch_task.file_size = file_size
+                    return batch_task
                 
-                max_size = 500 * 1024 * 1024  # 500MB para vídeos
-                if file_size > max_size:
-                    batch_task.error = f"Arquivo muito grande: {file_size} bytes (máximo: {max_size})"
+                # Validação do tamanho informado pelo upload
+                if file.size and file.size > MAX_VIDEO_SIZE:
+                    batch_task.error = f"Arquivo muito grande: {file.size} bytes (máximo: {MAX_VIDEO_SIZE})"
                     batch_task.status = "failed"
-                    batch_tasks.append(batch_task)
-                    continue
+                    return batch_task
                 
-                # Cria diretórios
-                videos_dir = Path(service.config.audios_dir).parent / "videos"
-                os.makedirs(videos_dir, exist_ok=True)
-                os.makedirs(service.config.audios_dir, exist_ok=True)
+                # Diretório criado na inicialização (ensure_upload_dirs)
+                videos_dir = _videos_dir(service.config.audios_dir)
                 
                 # Gera nomes únicos para os arquivos
-                task_id = f"{batch_id}_{len(batch_tasks):03d}_{datetime.now().strftime('%H%M%S')}"
-                video_path = videos_dir / f"{task_id}_{file.filename}"
+                task_id = f"{batch_id}_{index:03d}"
+                video_path = os.path.join(videos_dir, f"{task_id}_{file.filename}")
                 
                 # Cria subpasta para o áudio extraído
-                audio_subfolder = Path(service.config.audios_dir) / task_id
-                audio_subfolder.mkdir(parents=True, exist_ok=True)
+                audio_subfolder = os.path.join(service.config.audios_dir, task_id)
+                await run_fs(make_task_dir, audio_subfolder)
                 
-                audio_filename = f"{Path(file.filename).stem}.wav"
-                audio_path = audio_subfolder / audio_filename
+                audio_filename = f"{os.path.splitext(file.filename)[0]}.wav"
+                audio_path = os.path.join(audio_subfolder, audio_filename)
                 
-                # Salva o arquivo de vídeo temporariamente
-                contents = await file.read()
-                with open(video_path, "wb") as buffer:
-                    buffer.write(contents)
-                
-                logger.info(f"Vídeo salvo: {video_path}")
-                
-                # Extrai o áudio
-                success = extractor.extract_audio(str(video_path), str(audio_path))
-                
-                if not success:
-                    batch_task.error = "Falha na extração do áudio do vídeo"
-                    batch_task.status = "failed"
-                    # Remove arquivo temporário
-                    try:
-                        os.remove(video_path)
-                    except:
-                        pass
-                    batch_tasks.append(batch_task)
-                    continue
+                # Preserva o upload para extrair o áudio depois da resposta (o
+                # vídeo só vai para video_path se ainda estiver em memória)
+                async with semaphore:
+                    source_fd, batch_task.file_size = await keep_upload(file, video_path, MAX_VIDEO_SIZE)
                 
-                # Remove o arquivo de vídeo temporário
                 try:
-                    os.remove(video_path)
-                    logger.info(f"Arquivo de vídeo temporário removido: {video_path}")
-                except Exception as e:
-                    logger.warning(f"Não foi possível remover o arquivo temporário: {e}")
-                
-                # Cria 4 transcrições automaticamente com diferentes configurações
-                transcription_tasks = []
-                
-                # Configurações das 4 transcrições
-                configs = [
-                    {"timestamps": False, "diarization": False, "suffix": "limpa"},
-                    {"timestamps": True, "diarization": False, "suffix": "timestamps"},
-                    {"timestamps": False, "diarization": True, "suffix": "diarization"},
-                    {"timestamps": True, "diarization": True, "suffix": "completa"}
-                ]
-                
-                for config in configs:
-                    transcription_task_id = f"{task_id}_{config['suffix']}"
-                    task = service.create_task(transcription_task_id, audio_filename)
-                    transcription_tasks.append(task)
-                    logger.info(f"Transcrição {config['suffix']} criada: {transcription_task_id}")
+                    # Cria 4 transcrições automaticamente com diferentes configurações
+                    transcription_tasks = []
                     
-                    # Adiciona tarefa de transcrição em background
-                    background_tasks.add_task(
-                        service.process_transcription,
-                        task_id=transcription_task_id,
-                        audio_path=str(audio_path),
-                        output_format="txt",
-                        force_cpu=service.config.force_cpu,
-                        version_model=service.config.version_model,
-                        include_timestamps=config["timestamps"],
-                        include_speaker_diarization=config["diarization"],
-                        base_task_id=task_id,
-                        transcription_suffix=config["suffix"]
-                    )
+                    # Configurações das 4 transcrições
+                    configs = [
+                        {"timestamps": False, "diarization": False, "suffix": "limpa"},
+                        {"timestamps": True, "diarization": False, "suffix": "timestamps"},
+                        {"timestamps": False, "diarization": True, "suffix": "diarization"},
+                        {"timestamps": True, "diarization": True, "suffix": "completa"}
+                    ]
+                    
+                    variants = []
+                    for config in configs:
+                        transcription_task_id = f"{task_id}_{config['suffix']}"
+                        task = service.create_task(
+                            transcription_task_id, audio_filename, status=TranscriptionStatus.EXTRACTING
+                        )
+                        transcription_tasks.append(task)
+                        variants.append(TranscriptionVariant(
+                            task_id=transcription_task_id,
+                            include_timestamps=config["timestamps"],
+                            include_speaker_diarization=config["diarization"],
+                            transcription_suffix=config["suffix"]
+                        ))
+                except BaseException:
+                    await run_fs(discard_kept_upload, source_fd, video_path)
+                    raise
+                
+                # Uma única inferência para as 4 variantes, enfileirada após a extração
+                extractions.append((source_fd, video_path, TranscriptionJob(
+                    task_id=task_id,
+                    audio_path=audio_path,
+                    output_format="txt",
+                    force_cpu=service.config.force_cpu,
+                    version_model=service.config.version_model,
+                    base_task_id=task_id,
+                    variants=tuple(variants)
+                )))
                 
                 # Para compatibilidade com a resposta, usa a primeira tarefa (limpa) como principal
                 batch_task.task = transcription_tasks[0]
-                batch_task.status = "pending"
-                
-                logger.info(f"Vídeo {file.filename} processado e adicionado ao lote {batch_id}")
+                batch_task.status = TranscriptionStatus.EXTRACTING.value
                 
+            except HTTPException as e:
+                logger.error(f"Erro ao processar vídeo {file.filename}: {e.detail}")
+                batch_task.error = e.detail
+                batch_task.status = "failed"
             except Exception as e:
                 logger.error(f"Erro ao processar vídeo {file.filename}: {str(e)}")
                 batch_task.error = str(e)
                 batch_task.status = "failed"
             
-            batch_tasks.append(batch_task)
+            return batch_task
+        
+        # Recebe os vídeos em paralelo; a extração roda depois da resposta,
+        # que não espera pelo FFmpeg
+        batch_tasks: List[BatchUploadTask] = await asyncio.gather(
+            *(process_one(i, file) for i, file in enumerate(files))
+        )
+        if extractions:
+            background_tasks.add_task(
+                _extract_then_transcribe, service, dispatcher, extractions, _client_key(request)
+            )
         
         # Conta arquivos processados
         successful_files = len([t for t in batch_tasks if t.status != "failed"])
         
+        # Uma linha por lote em vez de uma por arquivo
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Lote de vídeos %s: %d/%d arquivos enfileirados (%s)",
+                batch_id, successful_files, len(files),
+                ", ".join(f"{t.filename}: {t.task.task_id if t.task else t.status}" for t in batch_tasks)
+            )
+        
         response = BatchUploadResponse(
             batch_id=batch_id,
             total_files=len(files),
@@ -992,7 +1073,7 @@ async def batch_upload_video(
             message=f"Lote de vídeos processado: {successful_files}/{len(files)} arquivos enviados com sucesso"
         )
         
-        return JSONResponse(status_code=202, content=jsonable_encoder(response))
+        return response
         
     except HTTPException:
         raise
@@ -0,0 +1,423 @@
+import asyncio
+import concurrent.futures
+import functools
+import io
+import itertools
+import os
+import secrets
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile, status
+from fastapi.responses import JSONResponse
+
+# Tamanho dos blocos usados para gravar uploads em disco
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Blocos gravados por chamada writev: uma syscall e uma troca de thread por lote
+UPLOAD_WRITE_BATCH = 8
+
+# Folga para cabeçalhos e delimitadores do multipart sobre o limite dos arquivos
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Mapeamento de extensões para tipos MIME
+EXTENSION_TO_MIME = {
+    '.wav': 'audio/wav',
+    '.mp3': 'audio/mp3',
+    '.ogg': 'audio/ogg',
+    '.m4a': 'audio/m4a',
+    '.flac': 'audio/flac',
+    '.aac': 'audio/aac'
+}
+
+# Sufixo sequencial dos IDs: garante unicidade mesmo com o mesmo timestamp.
+# O marcador aleatório, sorteado uma vez por processo, separa os contadores
+# de vários workers do servidor
+_ID_COUNTER = itertools.count()
+_ID_PROCESS_TAG = secrets.token_hex(2)
+
+def new_task_id() -> str:
+    """
+    ID de tarefa ordenável pelo horário de criação, sem formatar datas nem
+    ler /dev/urandom por requisição. Não é criptográfico: serve só para
+    unicidade, não como segredo
+    """
+    return f"{time.time_ns():x}_{_ID_PROCESS_TAG}{next(_ID_COUNTER):04x}"
+
+# Pool dedicado às chamadas de sistema de arquivos, isolado do executor
+# padrão do event loop (usado também pela extração e pela inferência).
+# Criado no primeiro uso e recriado depois de shutdown_fs_pool, para que a
+# aplicação possa passar por mais de um ciclo de lifespan no mesmo processo
+FS_POOL_WORKERS = 4
+_FS_POOL: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+def _fs_pool() -> concurrent.futures.ThreadPoolExecutor:
+    global _FS_POOL
+    if _FS_POOL is None:
+        _FS_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=FS_POOL_WORKERS, thread_name_prefix="fsio")
+    return _FS_POOL
+
+async def run_fs(fn, *args, **kwargs):
+    """Executa uma operação de arquivo bloqueante no pool de E/S"""
+    return await asyncio.get_running_loop().run_in_executor(_fs_pool(), functools.partial(fn, *args, **kwargs))
+
+def shutdown_fs_pool():
+    """Encerra o pool de E/S de arquivos (chamado no shutdown da aplicação)"""
+    global _FS_POOL
+    pool, _FS_POOL = _FS_POOL, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+def make_task_dir(path: str):
+    """
+    Cria a pasta de uma tarefa. O diretório base já existe desde a
+    inicialização e o ID da tarefa é novo, então basta um mkdir, sem os stat
+    do makedirs; se o diretório base tiver sido removido, recria o caminho
+    """
+    try:
+        os.mkdir(path)
+    except FileNotFoundError:
+        os.makedirs(path, exist_ok=True)
+
+def _open_upload(path: str, size_hint: Optional[int]) -> int:
+    """Cria o arquivo de destino, reservando o espaço quando o tamanho é conhecido"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+    if size_hint and hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, size_hint)
+        except OSError:
+            pass  # Sistema de arquivos sem suporte: grava sem reserva
+    return fd
+
+def _write_chunks(fd: int, chunks: List[bytes], hasher=None):
+    """Grava um lote de blocos com writev, repetindo em caso de escrita parcial"""
+    if hasher is not None:
+        for chunk in chunks:
+            hasher.update(chunk)
+    pending = [memoryview(chunk) for chunk in chunks]
+    if not hasattr(os, "writev"):
+        for view in pending:
+            while view:
+                view = view[os.write(fd, view):]
+        return
+    while pending:
+        written = os.writev(fd, pending)
+        while pending and written >= len(pending[0]):
+            written -= len(pending.pop(0))
+        if written:
+            pending[0] = pending[0][written:]
+
+def _close_upload(fd: int, size: int):
+    """Ajusta o tamanho final (descarta a reserva não usada) e fecha o arquivo"""
+    try:
+        os.ftruncate(fd, size)
+    finally:
+        os.close(fd)
+
+def _upload_fileno(file: UploadFile) -> Optional[int]:
+    """Descritor do arquivo temporário do upload, se ele já estiver em disco"""
+    src = file.file
+    if isinstance(src, tempfile.SpooledTemporaryFile) and not src._rolled:
+        return None  # Upload pequeno, ainda em memória
+    try:
+        return src.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+def _copy_file_range(src_fd: int, dst_fd: int, offset: int, count: int) -> int:
+    return os.copy_file_range(src_fd, dst_fd, count, offset)
+
+def _sendfile(src_fd: int, dst_fd: int, offset: int, count: int) -> int:
+    return os.sendfile(dst_fd, src_fd, offset, count)
+
+# Cópias no kernel em ordem de preferência: copy_file_range (Linux 4.5+,
+# entre sistemas de arquivos só a partir do 5.3) e sendfile, que no Linux
+# também aceita arquivo regular como destino
+_KERNEL_COPIES = []
+if hasattr(os, "copy_file_range"):
+    _KERNEL_COPIES.append(_copy_file_range)
+if sys.platform.startswith("linux") and hasattr(os, "sendfile"):
+    _KERNEL_COPIES.append(_sendfile)
+
+def _copy_in_kernel(src_fd: int, dst_fd: int, max_size: int) -> Optional[int]:
+    """
+    Copia o upload sem passar os dados pelo espaço de usuário. Retorna o
+    tamanho, ou None se nenhuma cópia no kernel funcionar (o destino é
+    esvaziado para o caminho por blocos)
+    """
+    size = os.fstat(src_fd).st_size
+    if size > max_size:
+        return size
+    for copy in _KERNEL_COPIES:
+        offset = 0
+        try:
+            while offset < size:
+                copied = copy(src_fd, dst_fd, offset, size - offset)
+                if copied == 0:
+                    break
+                offset += copied
+        except OSError:
+            pass  # Ex.: EXDEV/ENOSYS em kernels antigos
+        if offset == size:
+            return size
+        # Recomeça do zero com a próxima alternativa
+        os.lseek(dst_fd, 0, os.SEEK_SET)
+        os.ftruncate(dst_fd, 0)
+    return None
+
+def _hash_fd(fd: int, size: int, hasher):
+    """Atualiza o hash com o conteúdo do descritor, lido com pread (a posição não muda)"""
+    offset = 0
+    while offset < size:
+        chunk = os.pread(fd, UPLOAD_CHUNK_SIZE, offset)
+        if not chunk:
+            break
+        hasher.update(chunk)
+        offset += len(chunk)
+
+async def _stream_upload(file: UploadFile, fd: int, max_size: int, hasher=None) -> int:
+    """Grava o upload em lotes de blocos; para de gravar ao exceder max_size"""
+    size = 0
+    batch: List[bytes] = []
+    await file.seek(0)
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        size += len(chunk)
+        if size > max_size:
+            return size
+        batch.append(chunk)
+        if len(batch) >= UPLOAD_WRITE_BATCH:
+            await run_fs(_write_chunks, fd, batch, hasher)
+            batch = []
+    if batch:
+        await run_fs(_write_chunks, fd, batch, hasher)
+    return size
+
+@functools.lru_cache(maxsize=8)
+def _allowed_file_extensions(allowed_types: frozenset) -> frozenset:
+    """Extensões cujo tipo MIME está entre os permitidos, calculadas uma vez por configuração"""
+    return frozenset(ext for ext, mime in EXTENSION_TO_MIME.items() if mime in allowed_types)
+
+def is_audio_type_allowed(config, filename: str, content_type: Optional[str]) -> bool:
+    """Aceita se a extensão é válida OU se o content_type está correto"""
+    allowed_types = config.allowed_extensions
+    i = filename.rfind('.')
+    if i != -1 and filename[i:].lower() in _allowed_file_extensions(allowed_types):
+        return True
+    return content_type in allowed_types
+
+# Assinaturas no início do arquivo, para aceitar áudios com nome ou tipo
+# informado incorretos. O cabeçalho cobre a caixa ftyp com algumas marcas
+# compatíveis
+AUDIO_MAGIC_HEADER_SIZE = 64
+_AUDIO_MAGIC_PREFIXES = (
+    (b"ID3", "audio/mp3"),
+    (b"OggS", "audio/ogg"),
+    (b"fLaC", "audio/flac"),
+)
+# Marcas ftyp exclusivas de áudio; as genéricas (isom, mp41, qt...) são de vídeo
+_AUDIO_FTYP_BRANDS = frozenset({b"M4A ", b"M4B ", b"M4P ", b"F4A ", b"F4B "})
+
+def _is_audio_ftyp(header: bytes) -> bool:
+    """Caixa ftyp de um MP4 só de áudio: marca principal M4A/M4B, ou mp42 com marca compatível de áudio"""
+    major = header[8:12]
+    if major in _AUDIO_FTYP_BRANDS:
+        return True
+    if major != b"mp42":
+        return False
+    box_end = min(int.from_bytes(header[:4], "big"), len(header))
+    compatible = (header[i:i + 4] for i in range(16, box_end - 3, 4))
+    return any(brand in _AUDIO_FTYP_BRANDS for brand in compatible)
+
+def _is_mpeg_audio_frame(header: bytes) -> bool:
+    """Cabeçalho de quadro MPEG áudio válido (sincronismo, versão, camada, bitrate e sample rate)"""
+    if len(header) < 3 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return False
+    version = (header[1] >> 3) & 0b11
+    layer = (header[1] >> 1) & 0b11
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0b11
+    return version != 0b01 and layer != 0b00 and bitrate_index != 0b1111 and sample_rate_index != 0b11
+
+def sniff_audio_type(header: bytes) -> Optional[str]:
+    """Tipo MIME do áudio pelos primeiros bytes, ou None se não reconhecido"""
+    for prefix, mime in _AUDIO_MAGIC_PREFIXES:
+        if header.startswith(prefix):
+            return mime
+    if header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+        return "audio/wav"
+    if header[4:8] == b"ftyp":
+        return "audio/m4a" if _is_audio_ftyp(header) else None
+    if len(header) >= 2 and header[0] == 0xFF and header[1] & 0xF6 == 0xF0:
+        return "audio/aac"  # ADTS
+    if _is_mpeg_audio_frame(header):
+        return "audio/mp3"  # Quadro MPEG sem tag ID3
+    return None
+
+async def is_audio_upload_allowed(config, file: UploadFile) -> bool:
+    """
+    Como is_audio_type_allowed; se nome e content_type não bastarem, aceita
+    pelos bytes iniciais do upload
+    """
+    if is_audio_type_allowed(config, file.filename, file.content_type):
+        return True
+    await file.seek(0)
+    header = await file.read(AUDIO_MAGIC_HEADER_SIZE)
+    await file.seek(0)
+    return sniff_audio_type(header) in config.allowed_extensions
+
+@functools.lru_cache(maxsize=8)
+def allowed_types_str(allowed_types: frozenset) -> str:
+    """Lista dos tipos aceitos para mensagens, montada uma vez por configuração"""
+    return ', '.join(sorted(allowed_types))
+
+def _too_large(max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Tamanho do arquivo excede o limite de {max_size} bytes"
+    )
+
+async def save_upload(file: UploadFile, path: str, max_size: int, hasher=None) -> int:
+    """
+    Grava o upload em disco e retorna o tamanho gravado. Se o upload já foi
+    despejado em um arquivo temporário, copia no kernel; senão grava em
+    blocos de UPLOAD_CHUNK_SIZE, sem carregar o arquivo inteiro na memória.
+    Se hasher (ex.: hashlib.sha256()) for informado, recebe o conteúdo gravado
+    
+    Raises:
+        HTTPException: 413 se o arquivo exceder max_size. Em qualquer falha o
+            arquivo parcial é removido
+    """
+    size = None
+    src_fd = _upload_fileno(file)
+    # A E/S de disco roda em threads para não bloquear o event loop
+    size_hint = file.size if file.size and file.size <= max_size else None
+    fd = await run_fs(_open_upload, path, size_hint)
+    try:
+        if src_fd is not None:
+            size = await run_fs(_copy_in_kernel, src_fd, fd, max_size)
+            if hasher is not None and size is not None and size <= max_size:
+                await run_fs(_hash_fd, src_fd, size, hasher)
+        if size is None:
+            size = await _stream_upload(file, fd, max_size, hasher)
+        if size > max_size:
+            raise _too_large(max_size)
+    except BaseException:
+        await run_fs(_close_upload, fd, 0)
+        await run_fs(os.remove, path)
+        raise
+    
+    await run_fs(_close_upload, fd, size)
+    return size
+
+# O FFmpeg só consegue reabrir o stdin herdado com seek onde há /dev/stdin
+_HAS_DEV_STDIN = os.path.exists('/dev/stdin')
+
+async def extract_upload_audio(extractor, file: UploadFile, audio_path: str, fallback_path: str, max_size: int) -> int:
+    """
+    Extrai o áudio de um vídeo enviado sem gravar o vídeo em disco e retorna
+    o tamanho do vídeo. Se o upload já foi despejado em um arquivo temporário,
+    o FFmpeg lê esse arquivo; senão recebe os blocos pelo stdin. Se a leitura
+    sem seek falhar (ex.: MP4 com o índice no fim), grava o vídeo em
+    fallback_path, extrai dele e o remove, como antes
+    
+    Raises:
+        HTTPException: 413 se o vídeo exceder max_size; 500 se a extração falhar
+    """
+    src_fd = _upload_fileno(file) if _HAS_DEV_STDIN else None
+    if src_fd is not None:
+        size = (await run_fs(os.fstat, src_fd)).st_size
+        if size > max_size:
+            raise _too_large(max_size)
+        success = await extractor.extract_audio_stream(audio_path, source_fd=src_fd)
+    else:
+        size = 0
+        
+        async def chunks():
+            nonlocal size
+            await file.seek(0)
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise _too_large(max_size)
+                yield chunk
+        
+        success = await extractor.extract_audio_stream(audio_path, chunks=chunks())
+        if not success:
+            size = await save_upload(file, fallback_path, max_size)
+            try:
+                success = await asyncio.to_thread(extractor.extract_audio, fallback_path, audio_path)
+            finally:
+                await run_fs(os.remove, fallback_path)
+    
+    if not success:
+        raise HTTPException(status_code=500, detail="Falha na extração do áudio do vídeo")
+    return size
+
+async def keep_upload(file: UploadFile, fallback_path: str, max_size: int) -> Tuple[Optional[int], int]:
+    """
+    Preserva um vídeo enviado para extrair o áudio depois da resposta, quando
+    o UploadFile já terá sido fechado. Se o upload já está em um arquivo
+    temporário, duplica o descritor (o arquivo continua acessível depois do
+    fechamento) e nada é gravado; senão grava o vídeo em fallback_path.
+    Retorna (descritor ou None, tamanho); use extract_kept_upload ou
+    discard_kept_upload para liberá-lo
+    
+    Raises:
+        HTTPException: 413 se o vídeo exceder max_size
+    """
+    src_fd = _upload_fileno(file) if _HAS_DEV_STDIN else None
+    if src_fd is not None:
+        size = (await run_fs(os.fstat, src_fd)).st_size
+        if size > max_size:
+            raise _too_large(max_size)
+        return os.dup(src_fd), size
+    return None, await save_upload(file, fallback_path, max_size)
+
+def discard_kept_upload(source_fd: Optional[int], video_path: str):
+    """Libera um vídeo preservado por keep_upload sem extrair o áudio"""
+    if source_fd is not None:
+        os.close(source_fd)
+    else:
+        try:
+            os.remove(video_path)
+        except FileNotFoundError:
+            pass
+
+async def extract_kept_upload(extractor, source_fd: Optional[int], video_path: str, audio_path: str) -> bool:
+    """Extrai o áudio de um vídeo preservado por keep_upload e o libera"""
+    try:
+        if source_fd is not None:
+            return await extractor.extract_audio_stream(audio_path, source_fd=source_fd)
+        return await asyncio.to_thread(extractor.extract_audio, video_path, audio_path)
+    finally:
+        await run_fs(discard_kept_upload, source_fd, video_path)
+
+class UploadSizeLimitMiddleware:
+    """
+    Middleware ASGI que rejeita com 413, pelo Content-Length, uploads maiores
+    que o limite da rota antes que o corpo seja lido e despejado em disco.
+    Requisições sem Content-Length seguem adiante; save_upload continua
+    aplicando o limite durante a gravação
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST":
+            limit = self.limits.get(scope["path"])
+            if limit is not None:
+                for name, value in scope["headers"]:
+                    if name == b"content-length":
+                        if value.isdigit() and int(value) > limit + MULTIPART_OVERHEAD:
+                            response = JSONResponse(
+                                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                content={"detail": f"Tamanho do arquivo excede o limite de {limit} bytes"}
+                            )
+                            await response(scope, receive, send)
+                            return
+                        break
+        await self.app(scope, receive, send)
@@ -1,17 +1,20 @@
+import functools
 import os
 from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
-from typing import Optional, Set
+from typing import Dict, FrozenSet, Optional
 
 from dotenv import load_dotenv
-from pydantic import BaseModel, ConfigDict
 
 from src.core.logger_config import get_logger
 
 logger = get_logger(__name__)
 
-load_dotenv()
+# Workers de reload reimportam o módulo; o .env só precisa ser lido uma vez
+if not os.environ.get("_DOTENV_LOADED"):
+    load_dotenv()
+    os.environ["_DOTENV_LOADED"] = "1"
 
 class ModelSize(str, Enum):
     TINY = "tiny"
@@ -30,9 +33,13 @@ class ModelSize(str, Enum):
     DISTIL_MEDIUM_EN = "distil-medium.en"
     DISTIL_SMALL_EN = "distil-small.en"
 
-class AppConfig(BaseModel):
+# Nomes aceitos em VERSION_MODEL, incluindo o legado 'turbo'
+_MODEL_ALIASES: Dict[str, ModelSize] = {"turbo": ModelSize.LARGE_V3, **{m.value: m for m in ModelSize}}
+
+@dataclass(slots=True, frozen=True)
+class AppConfig:
     """
-    Classe de configuração da aplicação
+    Classe de configuração da aplicação (imutável após a criação)
     """
     hf_token: str
     audios_dir: Path = Path("../public/audios")
@@ -40,33 +47,36 @@ class AppConfig(BaseModel):
     version_model: ModelSize = ModelSize.LARGE_V3  # Using latest large model as default
     force_cpu: bool = True
     max_file_size: int = 100 * 1024 * 1024  # 100MB
-    allowed_extensions: Set[str] = {"audio/mp3", "audio/wav", "audio/ogg", "audio/m4a", "audio/flac", "audio/aac", "audio/x-wav"}
-    
-    model_config = ConfigDict(protected_namespaces=())
+    allowed_extensions: FrozenSet[str] = field(default_factory=lambda: frozenset({"audio/mp3", "audio/wav", "audio/ogg", "audio/m4a", "audio/flac", "audio/aac", "audio/x-wav"}))
+    allowed_suffixes: FrozenSet[str] = field(default_factory=lambda: frozenset({"mp3", "wav", "ogg", "m4a", "flac", "aac"}))
+    transcription_workers: int = 1  # Transcrições simultâneas no dispatcher
     
     @classmethod
     def from_env(cls) -> 'AppConfig':
         """
         Carrega configuração das variáveis de ambiente
         """
-        hf_token = os.getenv('HUGGING_FACE_HUB_TOKEN')
+        env = os.environ
+        hf_token = env.get('HUGGING_FACE_HUB_TOKEN')
         if not hf_token:
             raise ValueError(
                 "Token do HuggingFace não encontrado. "
                 "Configure a variável HUGGING_FACE_HUB_TOKEN no arquivo .env"
             )
         
-        # Handle legacy 'turbo' model name
-        model_env = os.getenv('VERSION_MODEL', 'large-v3')
-        if model_env == 'turbo':
-            model_env = 'large-v3'  # Map turbo to large-v3
+        model_env = env.get('VERSION_MODEL', 'large-v3')
+        version_model = _MODEL_ALIASES.get(model_env.lower())
+        if version_model is None:
+            logger.warning(f"VERSION_MODEL desconhecido '{model_env}', usando {ModelSize.LARGE_V3.value}")
+            version_model = ModelSize.LARGE_V3
         
         return cls(
             hf_token=hf_token,
-            audios_dir=Path(os.getenv('AUDIOS_DIR', '../public/audios')),
-            transcriptions_dir=Path(os.getenv('TRANSCRIPTIONS_DIR', '../public/transcriptions')),
-            version_model=model_env,
-            force_cpu=os.getenv('FORCE_CPU', 'false').lower() == 'true'
+            audios_dir=Path(env.get('AUDIOS_DIR', '../public/audios')),
+            transcriptions_dir=Path(env.get('TRANSCRIPTIONS_DIR', '../public/transcriptions')),
+            version_model=version_model,
+            force_cpu=env.get('FORCE_CPU', 'false').lower() == 'true',
+            transcription_workers=int(env.get('TRANSCRIPTION_WORKERS', '1'))
         )
         
     def get_audio_path(self, filename: str) -> Path:
@@ -75,18 +85,18 @@ class AppConfig(BaseModel):
     
     def get_transcription_path(self, filename: str, format: str = 'txt') -> Path:
         """Retorna o caminho completo para um arquivo de transcrição"""
-        base_name = Path(filename).stem
+        # Nome sem diretório e sem a última extensão, sem construir um Path
+        name = os.path.basename(filename)
+        dot = name.rfind('.')
+        base_name = name[:dot] if dot > 0 else name
         return self.transcriptions_dir / f"{base_name}.{format}"
     
     def is_file_allowed(self, filename: str) -> bool:
         """Verifica se o arquivo tem uma extensão permitida"""
-        return Path(filename).suffix.lower().lstrip('.') in self.allowed_extensions
+        dot = filename.rfind('.')
+        return dot >= 0 and filename[dot + 1:].lower() in self.allowed_suffixes
 
 # Função singleton para obter as configurações
-_config_instance = None
-
+@functools.lru_cache(maxsize=1)
 def get_settings() -> AppConfig:
-    global _config_instance
-    if _config_instance is None:
-        _config_instance = AppConfig.from_env()
-    return _config_instance
\ No newline at end of file
+    return AppConfig.from_env()
\ No newline at end of file
@@ -1,4 +1,5 @@
 import logging
+import sys
 
 from colorama import Fore, Style, init
 
@@ -19,19 +20,27 @@ class ColoredFormatter(logging.Formatter):
         logging.CRITICAL: (Fore.RED + Style.BRIGHT, "🚨")
     }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Levelname colorido de cada nível, montado uma única vez. Sem
+        # terminal (ex.: logs em Docker) fica vazio e não há cores
+        if sys.stderr is not None and sys.stderr.isatty():
+            self._levelnames = {
+                level: f"{color}{emoji} {logging.getLevelName(level)}{Style.RESET_ALL}"
+                for level, (color, emoji) in self.FORMATS.items()
+            }
+        else:
+            self._levelnames = {}
+
     def format(self, record):
-        # Obtém a cor e emoji para o nível atual
-        color, emoji = self.FORMATS.get(record.levelno, (Fore.WHITE, ""))
+        levelname = self._levelnames.get(record.levelno)
+        if levelname is None:
+            return super().format(record)
         
-        # Salva o levelname original
+        # Troca o levelname pelo colorido durante a formatação
         original_levelname = record.levelname
-        # Modifica o levelname para incluir cor e emoji
-        record.levelname = f"{color}{emoji} {original_levelname}{Style.RESET_ALL}"
-        
-        # Formata a mensagem
-        result = super().format(record)
-        
-        # Restaura o levelname original
-        record.levelname = original_levelname
-        
-        return result
\ No newline at end of file
+        record.levelname = levelname
+        try:
+            return super().format(record)
+        finally:
+            record.levelname = original_levelname
@@ -1,15 +1,31 @@
 # logger_config.py
+import atexit
 import logging
+import logging.handlers
+import queue
 
 from src.core.colored_formatter import ColoredFormatter
 
 
+# Thread que grava os registros enfileirados nos handlers reais
+_listener: logging.handlers.QueueListener = None
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(_stop_listener)
+
 def setup_global_logging(
     level: int = logging.INFO,
     log_file: str = None
 ) -> logging.Logger:
     """
     Configura o logger global com formatação colorida e opcionalmente salva em arquivo.
+    O logger só enfileira os registros; console e arquivo são escritos por uma
+    thread própria, sem bloquear o event loop nem disputar o lock dos handlers.
     
     Args:
         level: Nível de logging (default: logging.INFO)
@@ -23,8 +39,10 @@ def setup_global_logging(
     logger.setLevel(level)
     
     # Remove handlers existentes para evitar duplicação
+    _stop_listener()
     for handler in logger.handlers[:]:
         logger.removeHandler(handler)
+    handlers = []
     
     # Configuração do console handler com cores
     console_handler = logging.StreamHandler()
@@ -33,7 +51,7 @@ def setup_global_logging(
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
+    handlers.append(console_handler)
     
     # Configuração opcional do file handler
     if log_file:
@@ -43,7 +61,13 @@ def setup_global_logging(
             datefmt='%Y-%m-%d %H:%M:%S'
         )
         file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
+    
+    global _listener
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
     
     return logger
 
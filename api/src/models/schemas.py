@@ -11,6 +11,7 @@ class OutputFormat(str, Enum):
     SRT = "srt"
 
 class TranscriptionStatus(str, Enum):
+    EXTRACTING = "extracting"  # Aguardando a extração do áudio do vídeo
     PENDING = "pending"
     PROCESSING = "processing"
     COMPLETED = "completed"
@@ -31,11 +32,8 @@ class TranscriptionTask(BaseModel):
     completed_at: Optional[datetime] = None
     output_file: Optional[str] = None
     error: Optional[str] = None
-
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    # Hash do áudio + opções de saída, usado para reaproveitar transcrições repetidas
+    dedup_key: Optional[str] = None
 
     def update_task(
         self,
@@ -44,16 +42,17 @@ class TranscriptionTask(BaseModel):
         output_file: Optional[str] = None,
         error: Optional[str] = None
     ) -> 'TranscriptionTask':
-        """Retorna uma nova instância atualizada da tarefa"""
-        return TranscriptionTask(
-            task_id=self.task_id,
-            filename=self.filename,
-            status=status or self.status,
-            created_at=self.created_at,
-            completed_at=completed_at or self.completed_at,
-            output_file=output_file or self.output_file,
-            error=error or self.error
-        )
+        """
+        Retorna uma nova instância atualizada da tarefa. Usa model_copy, sem
+        revalidar os campos: os valores vêm do próprio serviço
+        """
+        changes = {
+            "status": status,
+            "completed_at": completed_at,
+            "output_file": output_file,
+            "error": error
+        }
+        return self.model_copy(update={name: value for name, value in changes.items() if value is not None})
 
 class TranscriptionListResponse(BaseModel):
     tasks: list[TranscriptionTask]
@@ -1,11 +1,54 @@
+import functools
+import os
+import sys
+from typing import List
+
+import torch
 from pyannote.audio import Pipeline
-pipeline = Pipeline.from_pretrained("pyannote/speaker-diarization@2.1",
-                                    use_auth_token="")
 
 
-# apply the pipeline to an audio file
-diarization = pipeline("audios/audio.wav")
+@functools.lru_cache(maxsize=1)
+def get_pipeline(token: str) -> Pipeline:
+    """Carrega o pipeline de diarização uma única vez por processo"""
+    pipeline = Pipeline.from_pretrained("pyannote/speaker-diarization@2.1",
+                                        use_auth_token=token)
+    if torch.cuda.is_available():
+        pipeline = pipeline.to(torch.device("cuda"))
+    else:
+        # Na CPU, quantiza LSTM/Linear da segmentação para int8
+        segmentation = getattr(pipeline, "_segmentation", None)
+        if segmentation is not None:
+            segmentation.model = torch.quantization.quantize_dynamic(
+                segmentation.model, {torch.nn.LSTM, torch.nn.Linear}, dtype=torch.qint8
+            )
+    return pipeline
+
+
+def _autocast_dtype() -> torch.dtype:
+    """BF16 em GPUs Ampere+ e FP16 nas demais"""
+    return torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+
+
+def diarize_batch(audio_paths: List[str]) -> list:
+    """
+    Diariza vários arquivos reaproveitando o mesmo pipeline já residente na GPU
+    """
+    pipeline = get_pipeline(os.getenv("HUGGING_FACE_HUB_TOKEN", ""))
+    with torch.inference_mode():
+        if not torch.cuda.is_available():
+            return [pipeline(audio_path) for audio_path in audio_paths]
+        with torch.autocast("cuda", dtype=_autocast_dtype()):
+            return [pipeline(audio_path) for audio_path in audio_paths]
+
+
+def main(audio_path: str, rttm_path: str):
+    # apply the pipeline to an audio file
+    diarization, = diarize_batch([audio_path])
+
+    # dump the diarization output to disk using RTTM format
+    with open(rttm_path, "w") as rttm:
+        diarization.write_rttm(rttm)
+
 
-# dump the diarization output to disk using RTTM format
-with open("audio.rttm", "w") as rttm:
-    diarization.write_rttm(rttm)
\ No newline at end of file
+if __name__ == "__main__":
+    main(sys.argv[1], sys.argv[2])
@@ -100,6 +100,19 @@ class AudioTranscriber:
             self.has_diarization = False
             # Não raise aqui, permite continuar sem diarização
 
+    def warmup(self):
+        """
+        Executa uma inferência curta em silêncio para inicializar CUDA/cuDNN
+        antes da primeira requisição real.
+        """
+        self.logger.info("Aquecendo modelo Whisper...")
+        try:
+            silence = np.zeros(16000, dtype=np.float32)  # 1s a 16kHz
+            self.model.transcribe(silence, batch_size=1)
+            self.logger.info("Modelo Whisper aquecido")
+        except Exception as e:
+            self.logger.warning(f"Falha no aquecimento do modelo: {e}")
+
     def _convert_to_wav(self, input_path: str) -> str:
         """Converte arquivo de áudio para WAV se necessário."""
         input_path = Path(input_path)
@@ -211,6 +224,28 @@ class AudioTranscriber:
         task_id: Optional[str] = None,
         transcription_suffix: Optional[str] = None
     ) -> str:
+        result = self.transcribe_once(audio_path, batch_size, include_speaker_diarization)
+        return self.render(
+            result,
+            audio_path,
+            output_dir,
+            output_format,
+            include_timestamps,
+            include_speaker_diarization,
+            task_id,
+            transcription_suffix
+        )
+
+    def transcribe_once(
+        self,
+        audio_path: str,
+        batch_size: Optional[int] = None,
+        include_speaker_diarization: bool = True
+    ) -> dict:
+        """
+        Executa transcrição, alinhamento e diarização (se solicitada) e retorna
+        os segmentos brutos, que podem ser renderizados em várias saídas.
+        """
         try:
             if not os.path.exists(audio_path):
                 raise FileNotFoundError(f"Arquivo de áudio não encontrado: {audio_path}")
@@ -223,10 +258,15 @@ class AudioTranscriber:
                 
             batch_size = batch_size or self.batch_size
             
+            # Decodifica uma única vez para 16 kHz mono (float32); transcrição,
+            # alinhamento e diarização recebem o mesmo array em vez de cada
+            # etapa decodificar e reamostrar o arquivo de novo
+            audio = whisperx.load_audio(audio_path)
+            
             # Transcrição inicial
             self.logger.info(f"Iniciando transcrição: {audio_path}")
             result = self.model.transcribe(
-                audio_path,
+                audio,
                 batch_size=batch_size
             )
             self.logger.info("Transcrição inicial concluída")
@@ -242,7 +282,7 @@ class AudioTranscriber:
                     result["segments"],
                     model_a,
                     metadata,
-                    audio_path,
+                    audio,
                     self.device
                 )
                 self.logger.info("Alinhamento concluído com sucesso")
@@ -255,7 +295,10 @@ class AudioTranscriber:
             if include_speaker_diarization and hasattr(self, 'has_diarization') and self.has_diarization:
                 self.logger.info("Iniciando processo de diarização...")
                 try:
-                    diarization = self.diarize_model(audio_path)
+                    diarization = self.diarize_model({
+                        "waveform": torch.from_numpy(audio).unsqueeze(0),  # (canal, amostras)
+                        "sample_rate": 16000
+                    })
                     
                     if diarization is not None:
                         self.logger.info("Processando resultado da diarização...")
@@ -273,18 +316,31 @@ class AudioTranscriber:
                 else:
                     self.logger.info("Diarização não disponível - continuando sem diarização")
             
-            # Salvar resultado
-            output_path = self._prepare_output_path(audio_path, output_dir, output_format, task_id, transcription_suffix)
-            self._save_transcription(result, output_path, output_format, include_timestamps, include_speaker_diarization)
-            
-            self.logger.info(f"Transcrição finalizada: {output_path}")
-            return output_path
+            return result
 
         except Exception as e:
             self.logger.error(f"Erro durante a transcrição: {str(e)}")
             self.logger.error(traceback.format_exc())
             raise
 
+    def render(
+        self,
+        result: dict,
+        audio_path: str,
+        output_dir: Optional[str] = None,
+        output_format: Literal["txt", "json", "srt"] = "txt",
+        include_timestamps: bool = True,
+        include_speaker_diarization: bool = True,
+        task_id: Optional[str] = None,
+        transcription_suffix: Optional[str] = None
+    ) -> str:
+        """Formata e salva o resultado de transcribe_once, retornando o caminho do arquivo."""
+        output_path = self._prepare_output_path(audio_path, output_dir, output_format, task_id, transcription_suffix)
+        self._save_transcription(result, output_path, output_format, include_timestamps, include_speaker_diarization)
+        
+        self.logger.info(f"Transcrição finalizada: {output_path}")
+        return output_path
+
     def _prepare_output_path(
         self, 
         audio_path: str, 
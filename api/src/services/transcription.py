@@ -1,6 +1,8 @@
+import asyncio
 import json
 import os
 import shutil
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional
@@ -12,6 +14,14 @@ from src.services.audio_transcriber import AudioTranscriber
 
 logger = get_logger(__name__)
 
+@dataclass(frozen=True)
+class TranscriptionVariant:
+    """Uma saída renderizada a partir de uma única inferência compartilhada"""
+    task_id: str
+    include_timestamps: bool
+    include_speaker_diarization: bool
+    transcription_suffix: str
+
 class TranscriptionService:
     def __init__(self, config: AppConfig):
         self.config = config
@@ -33,6 +43,7 @@ class TranscriptionService:
             logger.warning(f"Usando diretório temporário para tasks: {self.tasks_file}")
         
         self._tasks: Dict[str, TranscriptionTask] = {}
+        self._dedup_index: Dict[str, str] = {}  # dedup_key -> task_id
         self._load_tasks()
         self._ensure_directories()
 
@@ -61,6 +72,11 @@ class TranscriptionService:
                         task_id: self._deserialize_task(task_data)
                         for task_id, task_data in tasks_data.items()
                     }
+                self._dedup_index = {
+                    task.dedup_key: task_id
+                    for task_id, task in self._tasks.items()
+                    if task.dedup_key
+                }
                 logger.info(f"Carregadas {len(self._tasks)} tarefas do arquivo")
         except Exception as e:
             logger.error(f"Erro ao carregar tarefas: {e}")
@@ -110,6 +126,22 @@ class TranscriptionService:
             )
         return self.transcriber
 
+    def load_models(self):
+        """Carrega e aquece o transcritor padrão na inicialização da API"""
+        transcriber = self._get_transcriber(None, None)
+        transcriber.warmup()
+
+    def unload(self):
+        """Libera o transcritor e a memória de GPU associada"""
+        if self.transcriber is None:
+            return
+        has_cuda = self.transcriber.has_cuda
+        self.transcriber = None
+        if has_cuda:
+            import torch
+            torch.cuda.empty_cache()
+        logger.info("Transcritor descarregado")
+
     async def process_transcription(
         self, 
         task_id: str, 
@@ -129,10 +161,12 @@ class TranscriptionService:
             )
             self._save_tasks()  # Salva após atualizar status
 
-            transcriber = self._get_transcriber(force_cpu, version_model)
+            # Carga do modelo e inferência rodam fora do event loop
+            transcriber = await asyncio.to_thread(self._get_transcriber, force_cpu, version_model)
             # Usa base_task_id se fornecido, senão usa task_id
             folder_id = base_task_id if base_task_id else task_id
-            output_file = transcriber.transcribe(
+            output_file = await asyncio.to_thread(
+                transcriber.transcribe,
                 audio_path=audio_path,
                 output_dir=self.config.transcriptions_dir,
                 output_format=output_format,
@@ -158,6 +192,71 @@ class TranscriptionService:
             )
             self._save_tasks()  # Salva após erro
 
+    async def process_transcription_variants(
+        self,
+        audio_path: str,
+        output_format: OutputFormat,
+        force_cpu: Optional[bool],
+        version_model: Optional[str],
+        base_task_id: str,
+        variants: List[TranscriptionVariant]
+    ):
+        """
+        Roda a inferência (Whisper, alinhamento e diarização) uma única vez e
+        gera uma saída por variante apenas formatando o resultado em cache
+        """
+        for variant in variants:
+            self._tasks[variant.task_id] = self._tasks[variant.task_id].update_task(
+                status=TranscriptionStatus.PROCESSING
+            )
+        self._save_tasks()
+
+        try:
+            transcriber = await asyncio.to_thread(self._get_transcriber, force_cpu, version_model)
+            result = await asyncio.to_thread(
+                transcriber.transcribe_once,
+                audio_path,
+                include_speaker_diarization=any(v.include_speaker_diarization for v in variants)
+            )
+        except Exception as e:
+            logger.error(f"Erro na transcrição: {str(e)}")
+            for variant in variants:
+                self._tasks[variant.task_id] = self._tasks[variant.task_id].update_task(
+                    status=TranscriptionStatus.FAILED,
+                    completed_at=datetime.now(),
+                    error=str(e)
+                )
+            self._save_tasks()
+            return
+
+        for variant in variants:
+            task = self._tasks[variant.task_id]
+            try:
+                output_file = await asyncio.to_thread(
+                    transcriber.render,
+                    result,
+                    audio_path,
+                    output_dir=self.config.transcriptions_dir,
+                    output_format=output_format,
+                    include_timestamps=variant.include_timestamps,
+                    include_speaker_diarization=variant.include_speaker_diarization,
+                    task_id=base_task_id,
+                    transcription_suffix=variant.transcription_suffix
+                )
+                self._tasks[variant.task_id] = task.update_task(
+                    status=TranscriptionStatus.COMPLETED,
+                    completed_at=datetime.now(),
+                    output_file=output_file
+                )
+            except Exception as e:
+                logger.error(f"Erro ao gerar transcrição {variant.transcription_suffix}: {str(e)}")
+                self._tasks[variant.task_id] = task.update_task(
+                    status=TranscriptionStatus.FAILED,
+                    completed_at=datetime.now(),
+                    error=str(e)
+                )
+        self._save_tasks()
+
     def get_task_status(self, task_id: str) -> Optional[TranscriptionTask]:
         """Retorna o status de uma tarefa"""
         return self._tasks.get(task_id)
@@ -166,18 +265,78 @@ class TranscriptionService:
         """Lista todas as tarefas"""
         return list(self._tasks.values())
 
-    def create_task(self, task_id: str, filename: str) -> TranscriptionTask:
+    def create_task(
+        self,
+        task_id: str,
+        filename: str,
+        dedup_key: Optional[str] = None,
+        status: TranscriptionStatus = TranscriptionStatus.PENDING
+    ) -> TranscriptionTask:
         """Cria uma nova tarefa de transcrição"""
         task = TranscriptionTask(
             task_id=task_id,
             filename=filename,
-            status=TranscriptionStatus.PENDING,
-            created_at=datetime.now()
+            status=status,
+            created_at=datetime.now(),
+            dedup_key=dedup_key
         )
         self._tasks[task_id] = task
+        if dedup_key:
+            self._dedup_index[dedup_key] = task_id
         self._save_tasks()  # Salva após criar
         return task
 
+    def finish_extraction(self, task_ids: List[str], error: Optional[str] = None) -> List[str]:
+        """
+        Conclui a extração de áudio das tarefas ainda em EXTRACTING: passam a
+        PENDING ou, com error, a FAILED. Tarefas canceladas ou excluídas nesse
+        meio tempo não mudam. Retorna as que ficaram pendentes
+        """
+        pending = []
+        for task_id in task_ids:
+            task = self._tasks.get(task_id)
+            if task is None or task.status != TranscriptionStatus.EXTRACTING:
+                continue
+            if error:
+                self._tasks[task_id] = task.update_task(
+                    status=TranscriptionStatus.FAILED,
+                    completed_at=datetime.now(),
+                    error=error
+                )
+            else:
+                self._tasks[task_id] = task.update_task(status=TranscriptionStatus.PENDING)
+                pending.append(task_id)
+        self._save_tasks()
+        return pending
+
+    def find_duplicate(self, dedup_key: str) -> Optional[TranscriptionTask]:
+        """
+        Tarefa pendente, em andamento ou concluída para o mesmo áudio e opções.
+        Tarefas que falharam ou foram canceladas (cancel_task as marca como
+        FAILED) e concluídas cujo arquivo de saída sumiu não valem: a entrada
+        do índice é descartada e o áudio é transcrito de novo
+        """
+        task_id = self._dedup_index.get(dedup_key)
+        if task_id is None:
+            return None
+        task = self._tasks.get(task_id)
+        if (
+            task is None
+            or task.status == TranscriptionStatus.FAILED
+            or (
+                task.status == TranscriptionStatus.COMPLETED
+                and not (task.output_file and os.path.exists(task.output_file))
+            )
+        ):
+            del self._dedup_index[dedup_key]
+            return None
+        return task
+
+    def clear_tasks(self):
+        """Esvazia as tarefas em memória (o arquivo tasks.json não é alterado)"""
+        self._tasks = {}
+        self._dedup_index = {}
+
     def cancel_task(self, task_id: str) -> Optional[TranscriptionTask]:
         """
         Cancela uma tarefa de transcrição em andamento
@@ -242,6 +401,8 @@ class TranscriptionService:
             
             # Remove a tarefa da memória e do arquivo
             del self._tasks[task_id]
+            if task.dedup_key and self._dedup_index.get(task.dedup_key) == task_id:
+                del self._dedup_index[task.dedup_key]
             self._save_tasks()
             
             logger.info(f"Tarefa {task_id} excluída com sucesso (delete_files={delete_files})")
@@ -266,30 +427,26 @@ class TranscriptionService:
             "total_size": 0
         }
         
-        # Verifica arquivos de áudio
-        audio_dir = Path(self.config.audios_dir) / task_id
-        if audio_dir.exists():
-            for file_path in audio_dir.iterdir():
-                if file_path.is_file():
-                    size = file_path.stat().st_size
-                    info["audio_files"].append({
-                        "name": file_path.name,
-                        "size": size,
-                        "path": str(file_path)
-                    })
-                    info["total_size"] += size
-        
-        # Verifica arquivos de transcrição
-        transcription_dir = Path(self.config.transcriptions_dir) / task_id
-        if transcription_dir.exists():
-            for file_path in transcription_dir.iterdir():
-                if file_path.is_file():
-                    size = file_path.stat().st_size
-                    info["transcription_files"].append({
-                        "name": file_path.name,
-                        "size": size,
-                        "path": str(file_path)
-                    })
-                    info["total_size"] += size
+        # Verifica arquivos de áudio e de transcrição
+        for key, base_dir in (
+            ("audio_files", self.config.audios_dir),
+            ("transcription_files", self.config.transcriptions_dir)
+        ):
+            files = self._list_files(os.path.join(base_dir, task_id))
+            info[key] = files
+            info["total_size"] += sum(f["size"] for f in files)
         
-        return info
\ No newline at end of file
+        return info
+
+    @staticmethod
+    def _list_files(directory: str) -> List[Dict[str, Any]]:
+        """Lista os arquivos de um diretório com os.scandir (o tipo vem da própria leitura do diretório)"""
+        try:
+            with os.scandir(directory) as entries:
+                return [
+                    {"name": entry.name, "size": entry.stat().st_size, "path": entry.path}
+                    for entry in entries
+                    if entry.is_file()
+                ]
+        except FileNotFoundError:
+            return []
\ No newline at end of file
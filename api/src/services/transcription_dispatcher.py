@@ -0,0 +1,127 @@
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Tuple
+
+from src.core.logger_config import get_logger
+from src.models.schemas import OutputFormat, TranscriptionStatus
+from src.services.transcription import TranscriptionService, TranscriptionVariant
+
+logger = get_logger(__name__)
+
+@dataclass(frozen=True)
+class TranscriptionJob:
+    """Parâmetros de uma chamada a TranscriptionService.process_transcription"""
+    task_id: str
+    audio_path: str
+    output_format: OutputFormat
+    force_cpu: Optional[bool]
+    version_model: Optional[str]
+    include_timestamps: bool = True
+    include_speaker_diarization: bool = True
+    base_task_id: Optional[str] = None
+    transcription_suffix: Optional[str] = None
+    # Quando preenchido, a inferência roda uma vez e cada variante só é renderizada
+    variants: Tuple[TranscriptionVariant, ...] = ()
+
+class TranscriptionDispatcher:
+    """
+    Fila de transcrições consumida por um número fixo de workers assíncronos,
+    desacoplando a resposta HTTP da inferência e limitando a concorrência no
+    modelo (por padrão um worker, já que o transcritor é compartilhado).
+    
+    Cada cliente tem sua própria fila e os workers as atendem em rodízio,
+    de modo que um lote grande de um cliente não atrasa os demais
+    """
+
+    def __init__(self, service: TranscriptionService, workers: int = 1):
+        self.service = service
+        self.workers = max(1, workers)
+        self._queues: Dict[str, Deque[TranscriptionJob]] = {}
+        self._clients: Deque[str] = deque()  # Clientes com jobs, na ordem do rodízio
+        self._available = asyncio.Semaphore(0)
+        self._pending = 0
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        """Inicia os workers no event loop atual"""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"transcription-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Dispatcher de transcrições iniciado com {self.workers} worker(s)")
+
+    async def stop(self):
+        """Cancela os workers; jobs ainda na fila permanecem PENDING"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, job: TranscriptionJob, client: str = ""):
+        """Coloca um job na fila do cliente"""
+        queue = self._queues.get(client)
+        if queue is None:
+            queue = self._queues[client] = deque()
+            self._clients.append(client)
+        queue.append(job)
+        self._pending += 1
+        self._available.release()
+        logger.info(f"Transcrição {job.task_id} enfileirada ({self._pending} na fila)")
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _next_job(self) -> TranscriptionJob:
+        # Próximo cliente do rodízio; volta ao fim se ainda tiver jobs
+        client = self._clients.popleft()
+        queue = self._queues[client]
+        job = queue.popleft()
+        if queue:
+            self._clients.append(client)
+        else:
+            del self._queues[client]
+        self._pending -= 1
+        return job
+
+    def _is_pending(self, task_id: str) -> bool:
+        # Tarefas canceladas enquanto aguardavam na fila são descartadas
+        task = self.service.get_task_status(task_id)
+        if task is None or task.status != TranscriptionStatus.PENDING:
+            logger.info(f"Transcrição {task_id} ignorada (status: {task.status if task else 'removida'})")
+            return False
+        return True
+
+    async def _worker(self, index: int):
+        while True:
+            await self._available.acquire()
+            job = self._next_job()
+            try:
+                if job.variants:
+                    variants = [v for v in job.variants if self._is_pending(v.task_id)]
+                    if variants:
+                        await self.service.process_transcription_variants(
+                            audio_path=job.audio_path,
+                            output_format=job.output_format,
+                            force_cpu=job.force_cpu,
+                            version_model=job.version_model,
+                            base_task_id=job.base_task_id or job.task_id,
+                            variants=variants
+                        )
+                elif self._is_pending(job.task_id):
+                    await self.service.process_transcription(
+                        task_id=job.task_id,
+                        audio_path=job.audio_path,
+                        output_format=job.output_format,
+                        force_cpu=job.force_cpu,
+                        version_model=job.version_model,
+                        include_timestamps=job.include_timestamps,
+                        include_speaker_diarization=job.include_speaker_diarization,
+                        base_task_id=job.base_task_id,
+                        transcription_suffix=job.transcription_suffix
+                    )
+            except Exception as e:
+                logger.error(f"Erro no worker {index} ao processar {job.task_id}: {e}")
@@ -1,24 +1,55 @@
+import asyncio
 import os
 import subprocess
-from pathlib import Path
-from typing import Optional
+from typing import AsyncIterable, Optional
 
 from src.core.logger_config import get_logger
+from src.services.video_frame_extractor import ffmpeg_timeout
 
 logger = get_logger(__name__)
 
 class VideoAudioExtractor:
     """Serviço para extrair áudio de arquivos de vídeo usando FFmpeg"""
     
-    def __init__(self):
-        self.supported_video_formats = {
-            '.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', 
-            '.webm', '.m4v', '.3gp', '.mpg', '.mpeg'
-        }
+    SUPPORTED_VIDEO_FORMATS = frozenset({
+        '.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv',
+        '.webm', '.m4v', '.3gp', '.mpg', '.mpeg'
+    })
+    # Lista pronta para mensagens de erro
+    SUPPORTED_VIDEO_FORMATS_STR = ', '.join(sorted(SUPPORTED_VIDEO_FORMATS))
+    # Threads por processo FFmpeg, para extrações em paralelo não disputarem a CPU
+    FFMPEG_THREADS = 2
+    # Limite do ffprobe que mede a duração (e o timeout) da extração
+    FFPROBE_TIMEOUT = 30
     
-    def is_video_file(self, filename: str) -> bool:
+    @classmethod
+    def is_video_file(cls, filename: str) -> bool:
         """Verifica se o arquivo é um formato de vídeo suportado"""
-        return Path(filename).suffix.lower() in self.supported_video_formats
+        i = filename.rfind('.')
+        return i != -1 and filename[i:].lower() in cls.SUPPORTED_VIDEO_FORMATS
+    
+    @classmethod
+    def _ffmpeg_cmd(cls, source: str, output_path: str) -> list:
+        """Comando FFmpeg para extrair o áudio de source como WAV"""
+        # -i: arquivo de entrada
+        # -vn: não incluir vídeo
+        # -acodec pcm_s16le: codec de áudio WAV
+        # -ar 16000: sample rate 16kHz (ideal para transcrição)
+        # -ac 1: mono (1 canal)
+        # -threads: limita as threads de decodificação/codificação
+        # -y: sobrescrever arquivo de saída se existir
+        return [
+            'ffmpeg',
+            '-threads', str(cls.FFMPEG_THREADS),
+            '-i', source,
+            '-vn',  # Sem vídeo
+            '-acodec', 'pcm_s16le',  # Codec WAV
+            '-ar', '16000',  # Sample rate 16kHz
+            '-ac', '1',  # Mono
+            '-threads', str(cls.FFMPEG_THREADS),
+            '-y',  # Sobrescrever
+            output_path
+        ]
     
     def extract_audio(self, video_path: str, output_path: str) -> bool:
         """
@@ -40,32 +71,23 @@ class VideoAudioExtractor:
             # Cria o diretório de saída se não existir
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
             
-            # Comando FFmpeg para extrair áudio como WAV
-            # -i: arquivo de entrada
-            # -vn: não incluir vídeo
-            # -acodec pcm_s16le: codec de áudio WAV
-            # -ar 16000: sample rate 16kHz (ideal para transcrição)
-            # -ac 1: mono (1 canal)
-            # -y: sobrescrever arquivo de saída se existir
-            cmd = [
-                'ffmpeg',
-                '-i', video_path,
-                '-vn',  # Sem vídeo
-                '-acodec', 'pcm_s16le',  # Codec WAV
-                '-ar', '16000',  # Sample rate 16kHz
-                '-ac', '1',  # Mono
-                '-y',  # Sobrescrever
-                output_path
-            ]
+            cmd = self._ffmpeg_cmd(video_path, output_path)
             
             logger.info(f"Executando comando FFmpeg: {' '.join(cmd)}")
             
+            # Timeout proporcional à duração; sem ela, o padrão do extrator de frames
+            info = self.get_video_info(video_path)
+            try:
+                duration = float(info['format']['duration'])
+            except (TypeError, KeyError, ValueError):
+                duration = None
+            
             # Executa o comando FFmpeg
             result = subprocess.run(
                 cmd,
                 capture_output=True,
                 text=True,
-                timeout=300  # Timeout de 5 minutos
+                timeout=ffmpeg_timeout(duration)
             )
             
             if result.returncode == 0:
@@ -89,6 +111,115 @@ class VideoAudioExtractor:
             logger.error(f"Erro inesperado na extração de áudio: {str(e)}")
             return False
     
+    async def extract_audio_stream(
+        self,
+        output_path: str,
+        chunks: Optional[AsyncIterable[bytes]] = None,
+        source_fd: Optional[int] = None
+    ) -> bool:
+        """
+        Extrai o áudio sem gravar o vídeo em disco; o diretório de saída já
+        deve existir
+        
+        Args:
+            output_path: Caminho onde salvar o arquivo WAV
+            chunks: Blocos do vídeo, escritos no stdin do FFmpeg (pipe:0, sem
+                seek: contêineres com o índice no fim, como alguns MP4, falham)
+            source_fd: Descritor de um arquivo já em disco (ex.: o temporário
+                do upload). Vira o stdin do FFmpeg, que o lê por /dev/stdin
+                com seek. Tem precedência sobre chunks
+            
+        Returns:
+            bool: True se a extração foi bem-sucedida, False caso contrário
+        """
+        if source_fd is not None:
+            # Com o arquivo em disco o timeout acompanha a duração do vídeo
+            timeout = ffmpeg_timeout(await self._probe_duration(source_fd))
+            os.lseek(source_fd, 0, os.SEEK_SET)
+            cmd = self._ffmpeg_cmd('/dev/stdin', output_path)
+            stdin = source_fd
+        else:
+            # Pelo pipe não há como medir a duração antes; vale o timeout padrão
+            timeout = ffmpeg_timeout(None)
+            cmd = self._ffmpeg_cmd('pipe:0', output_path)
+            stdin = asyncio.subprocess.PIPE
+        
+        logger.info(f"Executando comando FFmpeg: {' '.join(cmd)}")
+        
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=stdin,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        # O stderr é lido em paralelo para o FFmpeg não travar com o pipe cheio
+        stderr_task = asyncio.ensure_future(proc.stderr.read())
+        try:
+            if source_fd is None:
+                try:
+                    async for chunk in chunks:
+                        proc.stdin.write(chunk)
+                        await proc.stdin.drain()
+                    proc.stdin.close()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # O FFmpeg encerrou antes do fim do vídeo; o erro vem no stderr
+            returncode = await asyncio.wait_for(proc.wait(), timeout=timeout)
+        except BaseException as e:
+            # Timeout, cancelamento ou erro do produtor dos blocos (ex.: 413)
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            stderr_task.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                logger.error(f"Timeout na extração de áudio para {output_path}")
+                return False
+            raise
+        
+        stderr = (await stderr_task).decode(errors='replace')
+        if returncode != 0:
+            logger.error(f"Erro no FFmpeg (código {returncode}): {stderr}")
+            return False
+        
+        # Verifica se o arquivo foi criado e tem tamanho > 0
+        if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+            logger.info(f"Áudio extraído com sucesso: {output_path}")
+            return True
+        logger.error("Arquivo de áudio não foi criado ou está vazio")
+        return False
+    
+    async def _probe_duration(self, source_fd: int) -> Optional[float]:
+        """Duração em segundos do vídeo em source_fd (via ffprobe), ou None se desconhecida"""
+        os.lseek(source_fd, 0, os.SEEK_SET)
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                'ffprobe',
+                '-v', 'quiet',
+                '-show_entries', 'format=duration',
+                '-of', 'default=noprint_wrappers=1:nokey=1',
+                '/dev/stdin',
+                stdin=source_fd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+        except OSError as e:
+            logger.warning(f"Não foi possível medir a duração do vídeo: {e}")
+            return None
+        try:
+            stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=self.FFPROBE_TIMEOUT)
+        except BaseException as e:
+            # Timeout ou cancelamento
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            if isinstance(e, asyncio.TimeoutError):
+                logger.warning("Timeout ao medir a duração do vídeo")
+                return None
+            raise
+        try:
+            return float(stdout)
+        except ValueError:
+            return None
+    
     def get_video_info(self, video_path: str) -> Optional[dict]:
         """
         Obtém informações sobre o arquivo de vídeo
@@ -109,7 +240,7 @@ class VideoAudioExtractor:
                 video_path
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=self.FFPROBE_TIMEOUT)
             
             if result.returncode == 0:
                 import json
@@ -118,6 +249,9 @@ class VideoAudioExtractor:
                 logger.error(f"Erro ao obter informações do vídeo: {result.stderr}")
                 return None
                 
+        except subprocess.TimeoutExpired:
+            logger.error(f"Timeout ao obter informações do vídeo: {video_path}")
+            return None
         except Exception as e:
             logger.error(f"Erro ao obter informações do vídeo: {str(e)}")
             return None
\ No newline at end of file
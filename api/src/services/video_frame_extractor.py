@@ -1,25 +1,308 @@
+import asyncio
+import functools
+import math
 import os
+import re
 import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import AsyncIterator, Callable, Optional, Dict, Iterator, List, Tuple, Union
 import shutil
 
+import numpy as np
+
 from src.core.logger_config import get_logger
 
+# orjson é opcional; o json da stdlib também aceita bytes
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+# libjpeg-turbo é opcional; sem ele a codificação JPEG fica a cargo do FFmpeg
+try:
+    from turbojpeg import TJPF_RGB, TurboJPEG
+    _turbojpeg = TurboJPEG()
+except Exception:
+    _turbojpeg = None
+
 logger = get_logger(__name__)
 
+# Marcadores de início (SOI) e fim (EOI) de uma imagem JPEG
+JPEG_SOI = b'\xff\xd8'
+JPEG_EOI = b'\xff\xd9'
+
+# Contador "frame=  123" das linhas de progresso do FFmpeg
+FFMPEG_FRAME_RE = re.compile(r'frame=\s*(\d+)')
+FFMPEG_FRAME_BYTES_RE = re.compile(rb'frame=\s*(\d+)')
+
+# Separadores de linha do stderr do FFmpeg (o progresso é reescrito com "\r")
+FFMPEG_LINE_SPLIT_RE = re.compile(rb'[\r\n]+')
+
+# Linhas finais do stderr do FFmpeg mantidas para diagnóstico de erros
+FFMPEG_STDERR_TAIL = 100
+
+# Timeout quando a duração do vídeo é desconhecida, e o mínimo para vídeos curtos
+FFMPEG_DEFAULT_TIMEOUT = 600
+FFMPEG_MIN_TIMEOUT = 60
+
+# Segundos sem uma nova linha "frame=" até o FFmpeg ser considerado travado
+FFMPEG_STALL_TIMEOUT = 120
+
+# Callback de progresso: (frames_processados, total_estimado ou None)
+ProgressCallback = Callable[[int, Optional[int]], None]
+
+# Threads dos filtros do FFmpeg; no modo pipe sobra metade dos núcleos para
+# o consumidor Python dos frames
+CPU_COUNT = os.cpu_count() or 1
+PIPE_FILTER_THREADS = max(2, CPU_COUNT // 2)
+
+# Máximo de termos eq(n,...) por filtro select, para não estourar o filtergraph
+MAX_SELECT_TERMS = 500
+
+# Codecs com decodificação por NVDEC
+NVDEC_CODECS = frozenset({
+    'h264', 'hevc', 'av1', 'vp8', 'vp9', 'mpeg1video', 'mpeg2video', 'mpeg4', 'vc1', 'mjpeg'
+})
+
+# Frames mantidos em memória entre o leitor do FFmpeg e o consumidor assíncrono
+FRAME_QUEUE_SIZE = 32
+
+# Entradas do cache de ffprobe; a instância é compartilhada entre requisições
+VIDEO_INFO_CACHE_SIZE = 128
+
+@functools.lru_cache(maxsize=1)
+def _ffmpeg_has_cuda_hwaccel() -> bool:
+    """Verifica (uma vez por processo) se o FFmpeg foi compilado com suporte a CUDA"""
+    try:
+        result = subprocess.run(
+            ['ffmpeg', '-hide_banner', '-hwaccels'],
+            capture_output=True,
+            text=True,
+            timeout=10
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+    return result.returncode == 0 and 'cuda' in result.stdout.split()
+
+def ffmpeg_timeout(duration: Optional[float]) -> float:
+    """Timeout proporcional à duração do vídeo (2x tempo real + 30s, mínimo de 60s)"""
+    if not duration:
+        return FFMPEG_DEFAULT_TIMEOUT
+    return max(FFMPEG_MIN_TIMEOUT, int(duration * 2) + 30)
+
+class FFmpegError(subprocess.CalledProcessError):
+    """FFmpeg terminou com erro; stderr guarda as últimas linhas da saída de erro"""
+    
+    def __str__(self):
+        return f"Erro no FFmpeg (código {self.returncode}): {self.stderr}"
+
+def _collect_stderr(tail: deque, pending: bytes, chunk: bytes) -> bytes:
+    """
+    Acrescenta ao tail as linhas completas de um bloco do stderr (sem as de
+    progresso "frame=") e retorna o trecho incompleto que sobrou
+    """
+    *lines, pending = FFMPEG_LINE_SPLIT_RE.split(pending + chunk)
+    tail.extend(line for line in lines if line and not FFMPEG_FRAME_BYTES_RE.search(line))
+    return pending
+
+def _stderr_text(tail: deque) -> str:
+    return b"\n".join(tail).decode("utf-8", errors="replace")
+
+@functools.lru_cache(maxsize=None)
+def _thread_args(filter_threads: int = CPU_COUNT) -> Tuple[str, ...]:
+    """Opções que liberam todos os núcleos para o encoder e a cadeia de filtros"""
+    return ('-threads', '0', '-filter_threads', str(filter_threads))
+
+@functools.lru_cache(maxsize=None)
+def _format_args(format: str, quality: int) -> Tuple[str, ...]:
+    """Parâmetros específicos do formato de saída, montados uma vez por combinação"""
+    if format == "jpg":
+        return ('-q:v', str(quality), '-huffman', 'default')
+    if format == "png":
+        return ('-compression_level', '0')  # Sem compressão para PNG
+    return ()
+
+def _parse_frame_rate(rate: str) -> float:
+    """Converte a taxa do ffprobe ("30000/1001" ou "25") em float, sem eval"""
+    num, _, den = rate.partition('/')
+    if not den:
+        return float(num)
+    den = int(den)
+    return int(num) / den if den else 0.0
+
+def _stream_rotation(stream: dict) -> int:
+    """Rotação do stream em graus: tag 'rotate' ou matriz de exibição (side data)"""
+    rotation = stream.get('tags', {}).get('rotate')
+    if rotation is None:
+        rotation = next(
+            (data['rotation'] for data in stream.get('side_data_list', []) if 'rotation' in data), 0
+        )
+    try:
+        return int(float(rotation))
+    except (TypeError, ValueError):
+        return 0
+
+def _display_size(video_info: dict) -> Tuple[int, int]:
+    """
+    (largura, altura) dos frames que o FFmpeg entrega: ele aplica a rotação
+    antes dos filtros, então vídeos girados em ±90° têm as dimensões trocadas
+    """
+    width, height = video_info['width'], video_info['height']
+    if video_info.get('rotation', 0) % 180 == 90:
+        return height, width
+    return width, height
+
 class VideoFrameExtractor:
     """Serviço para extrair frames de arquivos de vídeo usando FFmpeg"""
     
+    SUPPORTED_VIDEO_FORMATS = frozenset({
+        '.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv',
+        '.webm', '.m4v', '.3gp', '.mpg', '.mpeg'
+    })
+    # Lista pronta para mensagens de erro
+    SUPPORTED_VIDEO_FORMATS_STR = ', '.join(sorted(SUPPORTED_VIDEO_FORMATS))
+    
     def __init__(self):
-        self.supported_video_formats = {
-            '.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', 
-            '.webm', '.m4v', '.3gp', '.mpg', '.mpeg'
-        }
+        # Resultados do ffprobe indexados por (caminho, mtime, tamanho)
+        self._video_info_cache: Dict[Tuple[str, float, int], Optional[dict]] = {}
+        self._video_info_lock = threading.Lock()
     
-    def is_video_file(self, filename: str) -> bool:
+    @classmethod
+    def is_video_file(cls, filename: str) -> bool:
         """Verifica se o arquivo é um formato de vídeo suportado"""
-        return Path(filename).suffix.lower() in self.supported_video_formats
+        i = filename.rfind('.')
+        return i != -1 and filename[i:].lower() in cls.SUPPORTED_VIDEO_FORMATS
+    
+    def _input_args(self, video_path: str) -> List[str]:
+        """
+        Argumentos de entrada do FFmpeg; decodifica na GPU (NVDEC) quando
+        disponível e suportado pelo codec do vídeo. Os frames decodificados
+        voltam para a memória do sistema, então filtros e encoders seguem iguais.
+        """
+        if _ffmpeg_has_cuda_hwaccel():
+            video_info = self.get_video_info(video_path)
+            if video_info and video_info.get('codec') in NVDEC_CODECS:
+                return ['-hwaccel', 'cuda', '-i', video_path]
+        return ['-i', video_path]
+    
+    def _run_ffmpeg(
+        self,
+        cmd: List[str],
+        timeout: float,
+        progress_callback: Optional[ProgressCallback] = None,
+        total_frames: Optional[int] = None,
+        stall_timeout: Optional[float] = FFMPEG_STALL_TIMEOUT
+    ) -> subprocess.CompletedProcess:
+        """
+        Executa o FFmpeg lendo o stderr em streaming, sem decodificá-lo: mantém
+        apenas a última linha "frame=" (usada para o progresso) e as últimas
+        FFMPEG_STDERR_TAIL linhas restantes, decodificadas só ao final
+        
+        Raises:
+            subprocess.TimeoutExpired: Se o FFmpeg não terminar dentro do timeout
+                ou passar stall_timeout segundos sem reportar progresso
+        """
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
+        tail = deque(maxlen=FFMPEG_STDERR_TAIL)
+        last_frame_line = b""
+        last_progress = time.monotonic()
+        
+        def handle_line(line: bytes):
+            nonlocal last_frame_line, last_progress
+            match = FFMPEG_FRAME_BYTES_RE.search(line)
+            if not match:
+                tail.append(line)
+                return
+            last_frame_line = line
+            last_progress = time.monotonic()
+            if progress_callback is None:
+                return
+            try:
+                progress_callback(int(match.group(1)), total_frames)
+            except Exception as e:
+                logger.warning(f"Erro no callback de progresso: {e}")
+        
+        def drain_stderr():
+            pending = b""
+            while chunk := process.stderr.read1(65536):
+                *lines, pending = FFMPEG_LINE_SPLIT_RE.split(pending + chunk)
+                for line in lines:
+                    handle_line(line)
+            if pending:
+                handle_line(pending)
+        
+        reader = threading.Thread(target=drain_stderr, daemon=True)
+        reader.start()
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    raise subprocess.TimeoutExpired(cmd, timeout)
+                if stall_timeout is not None and now - last_progress >= stall_timeout:
+                    logger.error(f"FFmpeg sem progresso há {stall_timeout:.0f}s; encerrando")
+                    raise subprocess.TimeoutExpired(cmd, stall_timeout)
+                try:
+                    process.wait(timeout=min(1.0, deadline - now))
+                    break
+                except subprocess.TimeoutExpired:
+                    pass
+        except subprocess.TimeoutExpired:
+            process.terminate()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+            raise
+        finally:
+            reader.join(timeout=5)
+        
+        stderr = b"\n".join([*tail, last_frame_line]).decode("utf-8", errors="replace")
+        return subprocess.CompletedProcess(cmd, process.returncode, None, stderr)
+    
+    def _ffmpeg_failure(self, video_path: str, result: subprocess.CompletedProcess) -> Dict[str, any]:
+        """Monta o dict de erro de uma execução do FFmpeg que falhou"""
+        if "No such file or directory" in (result.stderr or ""):
+            logger.error(f"Arquivo de vídeo não encontrado: {video_path}")
+            return {"success": False, "error": "Arquivo de vídeo não encontrado"}
+        logger.error(f"Erro no FFmpeg (código {result.returncode}): {result.stderr}")
+        return {
+            "success": False,
+            "error": f"Erro no FFmpeg: {result.stderr}"
+        }
+    
+    def _list_output_frames(
+        self,
+        ffmpeg_stderr: str,
+        output_dir: str,
+        prefix: str,
+        format: str,
+        start_number: int = 1
+    ) -> List[str]:
+        """
+        Monta a lista de frames gravados (do 1º até o último desta execução) a
+        partir do contador de frames do FFmpeg, sem varrer o diretório.
+        Só recorre ao glob se o contador não puder ser lido.
+        """
+        matches = FFMPEG_FRAME_RE.findall(ffmpeg_stderr or "")
+        if matches:
+            last = start_number + int(matches[-1]) - 1
+            frames = [
+                os.path.join(output_dir, f"{prefix}_{i:06d}.{format}")
+                for i in range(1, last + 1)
+            ]
+            if not frames or os.path.exists(frames[-1]):
+                return frames
+        return [str(f) for f in sorted(Path(output_dir).glob(f"{prefix}_*.{format}"))]
     
     def extract_frames(
         self, 
@@ -27,7 +310,8 @@ class VideoFrameExtractor:
         output_dir: str, 
         fps: float = 1.0,
         quality: int = 2,
-        format: str = "jpg"
+        format: str = "jpg",
+        progress_callback: Optional[ProgressCallback] = None
     ) -> Dict[str, any]:
         """
         Extrai frames de um arquivo de vídeo e salva como imagens
@@ -38,15 +322,15 @@ class VideoFrameExtractor:
             fps: Frames por segundo a extrair (default: 1.0 = 1 frame por segundo)
             quality: Qualidade das imagens JPEG (1-31, menor = melhor qualidade)
             format: Formato das imagens (jpg ou png)
+            progress_callback: Chamado com (frames extraídos, total estimado) durante a extração
             
         Returns:
             Dict com informações sobre a extração
         """
         try:
-            # Verifica se o arquivo de vídeo existe
-            if not os.path.exists(video_path):
-                logger.error(f"Arquivo de vídeo não encontrado: {video_path}")
-                return {"success": False, "error": "Arquivo de vídeo não encontrado"}
+            # Uma única sondagem do vídeo, feita antes da extração; um arquivo
+            # inexistente é reportado pelo próprio FFmpeg
+            video_info = self.get_video_info(video_path)
             
             # Cria o diretório de saída se não existir
             os.makedirs(output_dir, exist_ok=True)
@@ -60,38 +344,34 @@ class VideoFrameExtractor:
             # -q:v: qualidade do vídeo (para JPEG)
             cmd = [
                 'ffmpeg',
-                '-i', video_path,
+                *self._input_args(video_path),
+                *_thread_args(),
                 '-vf', f'fps={fps}',
             ]
             
             # Adiciona parâmetros específicos do formato
-            if format == "jpg":
-                cmd.extend(['-q:v', str(quality)])
-            elif format == "png":
-                cmd.extend(['-compression_level', '0'])  # Sem compressão para PNG
+            cmd.extend(_format_args(format, quality))
             
             cmd.append(output_pattern)
             
             logger.info(f"Executando comando FFmpeg: {' '.join(cmd)}")
             
             # Executa o comando FFmpeg
-            result = subprocess.run(
+            total_frames = int(video_info['duration'] * fps) if video_info else None
+            result = self._run_ffmpeg(
                 cmd,
-                capture_output=True,
-                text=True,
-                timeout=600  # Timeout de 10 minutos
+                timeout=ffmpeg_timeout(video_info and video_info['duration']),
+                progress_callback=progress_callback,
+                total_frames=total_frames
             )
             
             if result.returncode == 0:
                 # Conta quantos frames foram extraídos
-                frame_files = list(Path(output_dir).glob(f"frame_*.{format}"))
-                frame_count = len(frame_files)
+                frames = self._list_output_frames(result.stderr, output_dir, "frame", format)
+                frame_count = len(frames)
                 
                 logger.info(f"Frames extraídos com sucesso: {frame_count} frames em {output_dir}")
                 
-                # Obtém informações do vídeo
-                video_info = self.get_video_info(video_path)
-                
                 return {
                     "success": True,
                     "frame_count": frame_count,
@@ -99,14 +379,10 @@ class VideoFrameExtractor:
                     "fps_extracted": fps,
                     "format": format,
                     "video_info": video_info,
-                    "frames": [str(f) for f in sorted(frame_files)]
+                    "frames": frames
                 }
             else:
-                logger.error(f"Erro no FFmpeg (código {result.returncode}): {result.stderr}")
-                return {
-                    "success": False,
-                    "error": f"Erro no FFmpeg: {result.stderr}"
-                }
+                return self._ffmpeg_failure(video_path, result)
                 
         except subprocess.TimeoutExpired:
             logger.error(f"Timeout na extração de frames de {video_path}")
@@ -121,13 +397,373 @@ class VideoFrameExtractor:
                 "error": f"Erro inesperado: {str(e)}"
             }
     
+    def extract_frames_turbo(
+        self,
+        video_path: str,
+        output_dir: str,
+        fps: float = 1.0,
+        jpeg_quality: int = 95,
+        max_workers: Optional[int] = None
+    ) -> Dict[str, any]:
+        """
+        Extrai frames em RGB24 pelo stdout do FFmpeg e os codifica em JPEG com
+        libjpeg-turbo em paralelo. Sem turbojpeg instalado, delega a extract_frames
+        
+        Args:
+            video_path: Caminho do arquivo de vídeo
+            output_dir: Diretório onde salvar as imagens
+            fps: Frames por segundo a extrair
+            jpeg_quality: Qualidade JPEG (1-100, maior = melhor qualidade)
+            max_workers: Threads de codificação (default: número de CPUs)
+            
+        Returns:
+            Dict com informações sobre a extração
+        """
+        if _turbojpeg is None:
+            logger.warning("turbojpeg não instalado; usando a codificação JPEG do FFmpeg")
+            return self.extract_frames(video_path, output_dir, fps=fps)
+        
+        def encode(path: str, frame: np.ndarray):
+            with open(path, 'wb') as f:
+                f.write(_turbojpeg.encode(frame, quality=jpeg_quality, pixel_format=TJPF_RGB))
+        
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            max_workers = max_workers or os.cpu_count() or 1
+            frames = []
+            pending = deque()
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for i, frame in enumerate(self.iter_frames(video_path, fps=fps, raw=True), start=1):
+                    path = os.path.join(output_dir, f"frame_{i:06d}.jpg")
+                    pending.append(executor.submit(encode, path, frame))
+                    frames.append(path)
+                    # Limita os frames decodificados aguardando codificação
+                    if len(pending) >= max_workers * 2:
+                        pending.popleft().result()
+                for future in pending:
+                    future.result()
+            
+            if not frames:
+                logger.error(f"Nenhum frame extraído de {video_path}")
+                return {"success": False, "error": "Nenhum frame extraído do vídeo"}
+            
+            logger.info(f"Frames extraídos com sucesso: {len(frames)} frames em {output_dir}")
+            
+            return {
+                "success": True,
+                "frame_count": len(frames),
+                "output_dir": output_dir,
+                "fps_extracted": fps,
+                "format": "jpg",
+                "video_info": self.get_video_info(video_path),
+                "frames": frames
+            }
+        except FileNotFoundError:
+            logger.error(f"Arquivo de vídeo não encontrado: {video_path}")
+            return {"success": False, "error": "Arquivo de vídeo não encontrado"}
+        except FFmpegError as e:
+            return self._ffmpeg_failure(
+                video_path, subprocess.CompletedProcess(e.cmd, e.returncode, None, e.stderr)
+            )
+        except Exception as e:
+            logger.error(f"Erro inesperado na extração de frames: {str(e)}")
+            return {
+                "success": False,
+                "error": f"Erro inesperado: {str(e)}"
+            }
+    
+    def iter_frames(
+        self,
+        video_path: str,
+        fps: float = 1.0,
+        quality: int = 2,
+        raw: bool = False,
+        chunk_size: int = 1 << 16
+    ) -> Iterator[Union[bytes, np.ndarray]]:
+        """
+        Extrai frames em memória, lendo a saída do FFmpeg pelo stdout sem
+        gravar arquivos em disco
+        
+        Args:
+            video_path: Caminho do arquivo de vídeo
+            fps: Frames por segundo a extrair
+            quality: Qualidade dos frames JPEG (1-31, menor = melhor qualidade)
+            raw: Se True, gera arrays RGB24 (altura x largura x 3) em vez de JPEG
+            chunk_size: Tamanho dos blocos lidos do stdout no modo JPEG
+            
+        Yields:
+            bytes de cada frame JPEG, ou np.ndarray no modo raw
+            
+        Raises:
+            FFmpegError: Se o FFmpeg terminar com erro (com o final do stderr)
+        """
+        cmd, shape = self._pipe_command(video_path, fps, quality, raw)
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        reader, tail = self._start_stderr_reader(process)
+        try:
+            if shape:
+                height, width, _ = shape
+                frame_size = height * width * 3
+                while True:
+                    data = process.stdout.read(frame_size)
+                    if len(data) < frame_size:
+                        break
+                    yield np.frombuffer(data, dtype=np.uint8).reshape(shape)
+            else:
+                buffer = bytearray()
+                while chunk := process.stdout.read(chunk_size):
+                    buffer += chunk
+                    yield from self._split_jpeg(buffer)
+        except BaseException:
+            # Consumidor parou antes do fim (ou erro na leitura): encerra o FFmpeg
+            if process.poll() is None:
+                process.kill()
+            raise
+        finally:
+            process.stdout.close()
+            process.wait()
+            reader.join(timeout=5)
+        
+        if process.returncode != 0:
+            raise FFmpegError(process.returncode, cmd, stderr=_stderr_text(tail))
+    
+    async def aiter_frames(
+        self,
+        video_path: str,
+        fps: float = 1.0,
+        quality: int = 2,
+        raw: bool = False,
+        chunk_size: int = 1 << 16,
+        queue_size: int = FRAME_QUEUE_SIZE
+    ) -> AsyncIterator[Union[bytes, np.ndarray]]:
+        """
+        Versão assíncrona de iter_frames: uma tarefa lê o stdout do FFmpeg e
+        entrega os frames por uma fila limitada, permitindo que o consumidor
+        processe cada frame enquanto o vídeo ainda está sendo decodificado
+        
+        Args:
+            video_path: Caminho do arquivo de vídeo
+            fps: Frames por segundo a extrair
+            quality: Qualidade dos frames JPEG (1-31, menor = melhor qualidade)
+            raw: Se True, gera arrays RGB24 (altura x largura x 3) em vez de JPEG
+            chunk_size: Tamanho dos blocos lidos do stdout no modo JPEG
+            queue_size: Máximo de frames aguardando o consumidor
+            
+        Yields:
+            bytes de cada frame JPEG, ou np.ndarray no modo raw
+            
+        Raises:
+            FFmpegError: Se o FFmpeg terminar com erro (com o final do stderr)
+        """
+        cmd, shape = await asyncio.to_thread(self._pipe_command, video_path, fps, quality, raw)
+        process = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        tail = deque(maxlen=FFMPEG_STDERR_TAIL)
+        
+        async def read_stderr():
+            pending = b""
+            while chunk := await process.stderr.read(65536):
+                pending = _collect_stderr(tail, pending, chunk)
+            _collect_stderr(tail, pending, b"\n")
+        
+        async def read_frames():
+            try:
+                if shape:
+                    height, width, _ = shape
+                    frame_size = height * width * 3
+                    while True:
+                        try:
+                            data = await process.stdout.readexactly(frame_size)
+                        except asyncio.IncompleteReadError:
+                            break
+                        await queue.put(np.frombuffer(data, dtype=np.uint8).reshape(shape))
+                else:
+                    buffer = bytearray()
+                    while chunk := await process.stdout.read(chunk_size):
+                        buffer += chunk
+                        for frame in self._split_jpeg(buffer):
+                            await queue.put(frame)
+            except Exception as e:
+                await queue.put(e)
+                return
+            await queue.put(None)
+        
+        stderr_reader = asyncio.create_task(read_stderr())
+        reader = asyncio.create_task(read_frames())
+        finished = False
+        try:
+            while (item := await queue.get()) is not None:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+            finished = True
+        finally:
+            reader.cancel()
+            # Só encerra o FFmpeg se o consumidor parou antes do fim do stdout
+            if not finished and process.returncode is None:
+                process.kill()
+            await process.wait()
+            await stderr_reader
+        
+        if process.returncode != 0:
+            raise FFmpegError(process.returncode, cmd, stderr=_stderr_text(tail))
+    
+    def _pipe_command(
+        self,
+        video_path: str,
+        fps: float,
+        quality: int,
+        raw: bool
+    ) -> Tuple[List[str], Optional[Tuple[int, int, int]]]:
+        """
+        Monta o comando FFmpeg que escreve os frames no stdout
+        
+        Returns:
+            Comando e, no modo raw, o formato (altura, largura, 3) de cada frame
+        """
+        cmd = ['ffmpeg', *self._input_args(video_path), *_thread_args(PIPE_FILTER_THREADS)]
+        shape = None
+        if raw:
+            # Um arquivo inexistente gera FileNotFoundError já na sondagem;
+            # fora do modo raw é reportado pelo próprio FFmpeg (FFmpegError)
+            video_info = self._cached_video_info(video_path)
+            if not video_info:
+                raise ValueError(f"Não foi possível obter as dimensões do vídeo: {video_path}")
+            width, height = _display_size(video_info)
+            shape = (height, width, 3)
+            # scale garante o tamanho fixo de cada frame; as dimensões já
+            # consideram a rotação aplicada pelo FFmpeg
+            cmd += ['-vf', f'fps={fps},scale={width}:{height}', '-f', 'rawvideo', '-pix_fmt', 'rgb24', 'pipe:1']
+        else:
+            cmd += ['-vf', f'fps={fps}', '-f', 'image2pipe', '-vcodec', 'mjpeg', *_format_args('jpg', quality), 'pipe:1']
+        
+        logger.info(f"Executando comando FFmpeg: {' '.join(cmd)}")
+        return cmd, shape
+    
+    @staticmethod
+    def _start_stderr_reader(process: subprocess.Popen) -> Tuple[threading.Thread, deque]:
+        """
+        Lê o stderr do FFmpeg em uma thread (evita travar com o pipe cheio),
+        mantendo só as últimas FFMPEG_STDERR_TAIL linhas para diagnóstico
+        """
+        tail = deque(maxlen=FFMPEG_STDERR_TAIL)
+        
+        def drain():
+            pending = b""
+            while chunk := process.stderr.read1(65536):
+                pending = _collect_stderr(tail, pending, chunk)
+            _collect_stderr(tail, pending, b"\n")
+        
+        reader = threading.Thread(target=drain, daemon=True)
+        reader.start()
+        return reader, tail
+    
+    @staticmethod
+    def _split_jpeg(buffer: bytearray) -> Iterator[bytes]:
+        """Retira do buffer cada imagem JPEG completa (SOI...EOI) já recebida"""
+        while True:
+            start = buffer.find(JPEG_SOI)
+            end = buffer.find(JPEG_EOI, start + 2) if start >= 0 else -1
+            if end < 0:
+                return
+            yield bytes(buffer[start:end + 2])
+            del buffer[:end + 2]
+    
+    def extract_batch_pinned(
+        self,
+        video_path: str,
+        num_frames: int,
+        size: Optional[Tuple[int, int]] = None,
+        fps: float = 1.0,
+        device: str = 'cuda'
+    ):
+        """
+        Decodifica até num_frames frames RGB24 direto em um buffer de memória
+        fixada (pinned) e os copia para a GPU de forma assíncrona, sobrepondo
+        a cópia de cada frame com a leitura do próximo
+        
+        Args:
+            video_path: Caminho do arquivo de vídeo
+            num_frames: Número máximo de frames a extrair
+            size: (largura, altura) de saída; usa as dimensões do vídeo se None
+            fps: Frames por segundo a extrair
+            device: Dispositivo CUDA de destino
+            
+        Returns:
+            torch.Tensor uint8 (N x 3 x altura x largura) no dispositivo CUDA
+        """
+        import torch
+        
+        if not torch.cuda.is_available():
+            raise RuntimeError("CUDA não disponível para extract_batch_pinned")
+        
+        # Arquivo inexistente: FileNotFoundError na sondagem ou FFmpegError
+        if size is None:
+            video_info = self._cached_video_info(video_path)
+            if not video_info:
+                raise ValueError(f"Não foi possível obter as dimensões do vídeo: {video_path}")
+            size = _display_size(video_info)
+        width, height = size
+        
+        cmd = [
+            'ffmpeg', *self._input_args(video_path), *_thread_args(PIPE_FILTER_THREADS),
+            '-vf', f'fps={fps},scale={width}:{height}',
+            '-frames:v', str(num_frames),
+            '-f', 'rawvideo', '-pix_fmt', 'rgb24', 'pipe:1'
+        ]
+        logger.info(f"Executando comando FFmpeg: {' '.join(cmd)}")
+        
+        # O FFmpeg entrega pixels intercalados (HWC); a troca para CHW é feita na GPU
+        host = torch.empty((num_frames, height, width, 3), dtype=torch.uint8, pin_memory=True)
+        gpu = torch.empty((num_frames, height, width, 3), dtype=torch.uint8, device=device)
+        stream = torch.cuda.Stream(device=device)
+        
+        count = 0
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        reader, tail = self._start_stderr_reader(process)
+        try:
+            while count < num_frames:
+                if not self._readinto_exact(process.stdout, host[count].numpy().data.cast('B')):
+                    break
+                with torch.cuda.stream(stream):
+                    gpu[count].copy_(host[count], non_blocking=True)
+                count += 1
+        except BaseException:
+            if process.poll() is None:
+                process.kill()
+            raise
+        finally:
+            process.stdout.close()
+            process.wait()
+            reader.join(timeout=5)
+        
+        if process.returncode != 0:
+            raise FFmpegError(process.returncode, cmd, stderr=_stderr_text(tail))
+        
+        stream.synchronize()
+        return gpu[:count].permute(0, 3, 1, 2)
+    
+    @staticmethod
+    def _readinto_exact(stream, view: memoryview) -> bool:
+        """Preenche todo o buffer a partir do stream; False se o stream terminar antes"""
+        filled = 0
+        while filled < len(view):
+            n = stream.readinto(view[filled:])
+            if not n:
+                return False
+            filled += n
+        return True
+    
     def extract_frames_at_intervals(
         self,
         video_path: str,
         output_dir: str,
         interval_seconds: float = 1.0,
         format: str = "jpg",
-        quality: int = 2
+        quality: int = 2,
+        progress_callback: Optional[ProgressCallback] = None
     ) -> Dict[str, any]:
         """
         Extrai frames em intervalos específicos
@@ -138,20 +774,247 @@ class VideoFrameExtractor:
             interval_seconds: Intervalo em segundos entre frames
             format: Formato das imagens
             quality: Qualidade das imagens
+            progress_callback: Chamado com (frames extraídos, total estimado) durante a extração
             
         Returns:
             Dict com informações sobre a extração
         """
         # Calcula FPS baseado no intervalo
         fps = 1.0 / interval_seconds
-        return self.extract_frames(video_path, output_dir, fps, quality, format)
+        return self.extract_frames(video_path, output_dir, fps, quality, format, progress_callback)
     
-    def extract_key_frames(
+    def extract_frames_many(
+        self,
+        video_paths: List[str],
+        output_dir: str,
+        fps: float = 1.0,
+        quality: int = 2,
+        format: str = "jpg",
+        max_workers: Optional[int] = None
+    ) -> Dict[str, Dict[str, any]]:
+        """
+        Extrai frames de vários vídeos em paralelo, um processo FFmpeg por vídeo
+        
+        Args:
+            video_paths: Caminhos dos arquivos de vídeo
+            output_dir: Diretório base; cada vídeo ganha um subdiretório próprio
+            fps: Frames por segundo a extrair
+            quality: Qualidade das imagens JPEG (1-31, menor = melhor qualidade)
+            format: Formato das imagens (jpg ou png)
+            max_workers: FFmpegs simultâneos (default: número de CPUs)
+            
+        Returns:
+            Dict com o resultado de extract_frames indexado pelo caminho do vídeo
+        """
+        def job(index: int, video_path: str) -> Dict[str, any]:
+            video_dir = os.path.join(output_dir, f"{index:03d}_{Path(video_path).stem}")
+            return self.extract_frames(video_path, video_dir, fps, quality, format)
+        
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 1) as executor:
+            futures = [executor.submit(job, i, path) for i, path in enumerate(video_paths)]
+            return {path: future.result() for path, future in zip(video_paths, futures)}
+    
+    def extract_frames_sharded(
+        self,
+        video_path: str,
+        output_dir: str,
+        fps: float = 1.0,
+        quality: int = 2,
+        format: str = "jpg",
+        shards: Optional[int] = None
+    ) -> Dict[str, any]:
+        """
+        Extrai frames de um único vídeo longo dividindo-o em intervalos de tempo
+        processados por FFmpegs simultâneos
+        
+        Args:
+            video_path: Caminho do arquivo de vídeo
+            output_dir: Diretório onde salvar as imagens
+            fps: Frames por segundo a extrair
+            quality: Qualidade das imagens JPEG (1-31, menor = melhor qualidade)
+            format: Formato das imagens (jpg ou png)
+            shards: Número de intervalos (default: número de CPUs)
+            
+        Returns:
+            Dict com informações sobre a extração, no mesmo formato de extract_frames
+        """
+        try:
+            video_info = self.get_video_info(video_path)
+            if not video_info or video_info['duration'] <= 0:
+                return self.extract_frames(video_path, output_dir, fps, quality, format)
+            
+            # Fronteiras alinhadas a múltiplos de 1/fps, para que o filtro fps de
+            # cada intervalo amostre os mesmos instantes de uma extração única
+            total = math.ceil(video_info['duration'] * fps)
+            shards = max(1, min(shards or os.cpu_count() or 1, total))
+            bounds = [round(total * k / shards) for k in range(shards + 1)]
+            
+            os.makedirs(output_dir, exist_ok=True)
+            
+            def run_shard(k: int) -> List[str]:
+                prefix = f"shard{k:03d}"
+                # -ss/-t antes do -i: busca rápida no demuxer, precisa ao decodificar
+                cmd = [
+                    'ffmpeg',
+                    '-ss', f'{bounds[k] / fps:.6f}',
+                    '-t', f'{(bounds[k + 1] - bounds[k]) / fps:.6f}',
+                    *self._input_args(video_path),
+                    *_thread_args(max(1, CPU_COUNT // shards)),
+                    '-vf', f'fps={fps}',
+                ]
+                cmd.extend(_format_args(format, quality))
+                cmd.append(os.path.join(output_dir, f"{prefix}_%06d.{format}"))
+                
+                logger.info(f"Executando comando FFmpeg: {' '.join(cmd)}")
+                result = self._run_ffmpeg(cmd, timeout=ffmpeg_timeout((bounds[k + 1] - bounds[k]) / fps))
+                if result.returncode != 0:
+                    raise RuntimeError(f"Erro no FFmpeg: {result.stderr}")
+                return self._list_output_frames(result.stderr, output_dir, prefix, format)
+            
+            with ThreadPoolExecutor(max_workers=shards) as executor:
+                shard_frames = list(executor.map(run_shard, range(shards)))
+            
+            # Junta os intervalos numa única sequência frame_000001, frame_000002, ...
+            frames = []
+            for path in (path for paths in shard_frames for path in paths):
+                target = os.path.join(output_dir, f"frame_{len(frames) + 1:06d}.{format}")
+                os.replace(path, target)
+                frames.append(target)
+            
+            logger.info(f"Frames extraídos com sucesso: {len(frames)} frames em {output_dir} ({shards} intervalos)")
+            
+            return {
+                "success": True,
+                "frame_count": len(frames),
+                "output_dir": output_dir,
+                "fps_extracted": fps,
+                "format": format,
+                "video_info": video_info,
+                "frames": frames,
+                "shards": shards
+            }
+        except subprocess.TimeoutExpired:
+            logger.error(f"Timeout na extração de frames de {video_path}")
+            return {
+                "success": False,
+                "error": "Timeout na extração de frames"
+            }
+        except Exception as e:
+            logger.error(f"Erro inesperado na extração de frames: {str(e)}")
+            return {
+                "success": False,
+                "error": f"Erro inesperado: {str(e)}"
+            }
+    
+    def extract_frames_at_timestamps(
         self,
         video_path: str,
         output_dir: str,
+        timestamps: List[float],
         format: str = "jpg",
         quality: int = 2
+    ) -> Dict[str, any]:
+        """
+        Extrai frames em instantes específicos com uma única execução do FFmpeg
+        (por bloco de até MAX_SELECT_TERMS frames), usando o filtro select
+        
+        Args:
+            video_path: Caminho do arquivo de vídeo
+            output_dir: Diretório onde salvar as imagens
+            timestamps: Instantes (em segundos) dos frames desejados
+            format: Formato das imagens (jpg ou png)
+            quality: Qualidade das imagens JPEG (1-31, menor = melhor qualidade)
+            
+        Returns:
+            Dict com informações sobre a extração, incluindo o frame de cada timestamp
+        """
+        try:
+            # A sondagem (necessária para o FPS) já reporta um arquivo inexistente
+            try:
+                video_info = self._cached_video_info(video_path)
+            except FileNotFoundError:
+                logger.error(f"Arquivo de vídeo não encontrado: {video_path}")
+                return {"success": False, "error": "Arquivo de vídeo não encontrado"}
+            if not video_info or not video_info.get('fps'):
+                return {"success": False, "error": "Não foi possível obter o FPS do vídeo"}
+            
+            os.makedirs(output_dir, exist_ok=True)
+            output_pattern = os.path.join(output_dir, f"frame_%06d.{format}")
+            
+            # Com -vsync 0 o FFmpeg emite os frames em ordem crescente de índice
+            fps = video_info['fps']
+            frame_indices = sorted({int(ts * fps) for ts in timestamps})
+            
+            frames: List[str] = []
+            for offset in range(0, len(frame_indices), MAX_SELECT_TERMS):
+                chunk = frame_indices[offset:offset + MAX_SELECT_TERMS]
+                select_expr = "+".join(f"eq(n\\,{i})" for i in chunk)
+                cmd = [
+                    'ffmpeg',
+                    *self._input_args(video_path),
+                    *_thread_args(),
+                    '-vf', f"select={select_expr},setpts=N/TB",
+                    '-vsync', '0',
+                    '-start_number', str(len(frames) + 1),
+                ]
+                cmd.extend(_format_args(format, quality))
+                cmd.extend(['-y', output_pattern])
+                
+                logger.info(f"Executando FFmpeg para {len(chunk)} timestamps")
+                
+                result = self._run_ffmpeg(cmd, timeout=ffmpeg_timeout(video_info['duration']))
+                if result.returncode != 0:
+                    logger.error(f"Erro no FFmpeg (código {result.returncode}): {result.stderr}")
+                    return {"success": False, "error": f"Erro no FFmpeg: {result.stderr}"}
+                
+                frames = self._list_output_frames(
+                    result.stderr, output_dir, "frame", format, start_number=len(frames) + 1
+                )
+            
+            # Timestamps além do fim do vídeo não geram arquivo
+            path_by_index = dict(zip(frame_indices, frames))
+            frames_by_timestamp = [
+                {
+                    "timestamp": ts,
+                    "frame_index": int(ts * fps),
+                    "path": path_by_index.get(int(ts * fps))
+                }
+                for ts in timestamps
+            ]
+            
+            logger.info(f"Frames extraídos por timestamp: {len(frames)} frames em {output_dir}")
+            
+            return {
+                "success": True,
+                "frame_count": len(frames),
+                "output_dir": output_dir,
+                "extraction_type": "timestamps",
+                "format": format,
+                "video_info": video_info,
+                "frames": frames,
+                "timestamps": frames_by_timestamp
+            }
+            
+        except subprocess.TimeoutExpired:
+            logger.error(f"Timeout na extração de frames de {video_path}")
+            return {
+                "success": False,
+                "error": "Timeout na extração de frames"
+            }
+        except Exception as e:
+            logger.error(f"Erro inesperado na extração de frames: {str(e)}")
+            return {
+                "success": False,
+                "error": f"Erro inesperado: {str(e)}"
+            }
+    
+    def extract_key_frames(
+        self,
+        video_path: str,
+        output_dir: str,
+        format: str = "jpg",
+        quality: int = 2,
+        progress_callback: Optional[ProgressCallback] = None
     ) -> Dict[str, any]:
         """
         Extrai apenas key frames (frames importantes) do vídeo
@@ -161,15 +1024,15 @@ class VideoFrameExtractor:
             output_dir: Diretório onde salvar as imagens
             format: Formato das imagens
             quality: Qualidade das imagens
+            progress_callback: Chamado com (key frames extraídos, None) durante a extração
             
         Returns:
             Dict com informações sobre a extração
         """
         try:
-            # Verifica se o arquivo de vídeo existe
-            if not os.path.exists(video_path):
-                logger.error(f"Arquivo de vídeo não encontrado: {video_path}")
-                return {"success": False, "error": "Arquivo de vídeo não encontrado"}
+            # Uma única sondagem do vídeo, feita antes da extração; um arquivo
+            # inexistente é reportado pelo próprio FFmpeg
+            video_info = self.get_video_info(video_path)
             
             # Cria o diretório de saída se não existir
             os.makedirs(output_dir, exist_ok=True)
@@ -180,36 +1043,32 @@ class VideoFrameExtractor:
             # Comando FFmpeg para extrair apenas key frames
             cmd = [
                 'ffmpeg',
-                '-i', video_path,
+                *self._input_args(video_path),
+                *_thread_args(),
                 '-vf', 'select=eq(pict_type\\,I)',  # Seleciona apenas I-frames (key frames)
                 '-vsync', 'vfr',  # Variable frame rate
             ]
             
             # Adiciona parâmetros específicos do formato
-            if format == "jpg":
-                cmd.extend(['-q:v', str(quality)])
-            elif format == "png":
-                cmd.extend(['-compression_level', '0'])
+            cmd.extend(_format_args(format, quality))
             
             cmd.append(output_pattern)
             
             logger.info(f"Executando comando FFmpeg para key frames: {' '.join(cmd)}")
             
-            result = subprocess.run(
+            # O total de key frames só é conhecido ao final da extração
+            result = self._run_ffmpeg(
                 cmd,
-                capture_output=True,
-                text=True,
-                timeout=600
+                timeout=ffmpeg_timeout(video_info and video_info['duration']),
+                progress_callback=progress_callback
             )
             
             if result.returncode == 0:
-                frame_files = list(Path(output_dir).glob(f"keyframe_*.{format}"))
-                frame_count = len(frame_files)
+                frames = self._list_output_frames(result.stderr, output_dir, "keyframe", format)
+                frame_count = len(frames)
                 
                 logger.info(f"Key frames extraídos: {frame_count} frames")
                 
-                video_info = self.get_video_info(video_path)
-                
                 return {
                     "success": True,
                     "frame_count": frame_count,
@@ -217,14 +1076,10 @@ class VideoFrameExtractor:
                     "extraction_type": "keyframes",
                     "format": format,
                     "video_info": video_info,
-                    "frames": [str(f) for f in sorted(frame_files)]
+                    "frames": frames
                 }
             else:
-                logger.error(f"Erro ao extrair key frames: {result.stderr}")
-                return {
-                    "success": False,
-                    "error": f"Erro no FFmpeg: {result.stderr}"
-                }
+                return self._ffmpeg_failure(video_path, result)
                 
         except Exception as e:
             logger.error(f"Erro ao extrair key frames: {str(e)}")
@@ -235,7 +1090,8 @@ class VideoFrameExtractor:
     
     def get_video_info(self, video_path: str) -> Optional[dict]:
         """
-        Obtém informações sobre o arquivo de vídeo
+        Obtém informações sobre o arquivo de vídeo, executando o ffprobe
+        apenas uma vez enquanto o arquivo não for alterado
         
         Args:
             video_path: Caminho do arquivo de vídeo
@@ -243,6 +1099,33 @@ class VideoFrameExtractor:
         Returns:
             dict: Informações do vídeo ou None se erro
         """
+        try:
+            return self._cached_video_info(video_path)
+        except OSError as e:
+            logger.error(f"Erro ao obter informações do vídeo: {str(e)}")
+            return None
+    
+    def _cached_video_info(self, video_path: str) -> Optional[dict]:
+        """
+        Como get_video_info, mas propaga o erro do stat (ex.: FileNotFoundError),
+        que também serve de verificação de existência do arquivo
+        """
+        stat = os.stat(video_path)
+        key = (video_path, stat.st_mtime, stat.st_size)
+        with self._video_info_lock:
+            if key in self._video_info_cache:
+                return self._video_info_cache[key]
+        
+        info = self._probe_video_info(video_path)
+        with self._video_info_lock:
+            if len(self._video_info_cache) >= VIDEO_INFO_CACHE_SIZE:
+                # Descarta a entrada mais antiga (ordem de inserção)
+                del self._video_info_cache[next(iter(self._video_info_cache))]
+            self._video_info_cache[key] = info
+        return info
+    
+    def _probe_video_info(self, video_path: str) -> Optional[dict]:
+        """Executa o ffprobe e extrai as informações relevantes do vídeo"""
         try:
             cmd = [
                 'ffprobe',
@@ -253,11 +1136,10 @@ class VideoFrameExtractor:
                 video_path
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = subprocess.run(cmd, capture_output=True)
             
             if result.returncode == 0:
-                import json
-                data = json.loads(result.stdout)
+                data = _json_loads(result.stdout)
                 
                 # Extrai informações relevantes
                 video_stream = next((s for s in data.get('streams', []) if s['codec_type'] == 'video'), None)
@@ -267,8 +1149,9 @@ class VideoFrameExtractor:
                         'duration': float(data['format'].get('duration', 0)),
                         'width': video_stream.get('width'),
                         'height': video_stream.get('height'),
-                        'fps': eval(video_stream.get('r_frame_rate', '0/1')),
+                        'fps': _parse_frame_rate(video_stream.get('r_frame_rate', '0/1')),
                         'codec': video_stream.get('codec_name'),
+                        'rotation': _stream_rotation(video_stream),
                         'total_frames': int(video_stream.get('nb_frames', 0)),
                         'format': data['format'].get('format_name'),
                         'size': int(data['format'].get('size', 0))
@@ -279,6 +1162,26 @@ class VideoFrameExtractor:
             logger.error(f"Erro ao obter informações do vídeo: {str(e)}")
             return None
     
+    async def extract_frames_async(self, *args, **kwargs) -> Dict[str, any]:
+        """Versão assíncrona de extract_frames; o FFmpeg roda fora do event loop"""
+        return await asyncio.to_thread(self.extract_frames, *args, **kwargs)
+    
+    async def extract_frames_at_intervals_async(self, *args, **kwargs) -> Dict[str, any]:
+        """Versão assíncrona de extract_frames_at_intervals"""
+        return await asyncio.to_thread(self.extract_frames_at_intervals, *args, **kwargs)
+    
+    async def extract_frames_at_timestamps_async(self, *args, **kwargs) -> Dict[str, any]:
+        """Versão assíncrona de extract_frames_at_timestamps"""
+        return await asyncio.to_thread(self.extract_frames_at_timestamps, *args, **kwargs)
+    
+    async def extract_key_frames_async(self, *args, **kwargs) -> Dict[str, any]:
+        """Versão assíncrona de extract_key_frames"""
+        return await asyncio.to_thread(self.extract_key_frames, *args, **kwargs)
+    
+    async def get_video_info_async(self, video_path: str) -> Optional[dict]:
+        """Versão assíncrona de get_video_info"""
+        return await asyncio.to_thread(self.get_video_info, video_path)
+    
     def cleanup_output_dir(self, output_dir: str) -> bool:
         """
         Remove um diretório de saída e todo seu conteúdo
@@ -125,7 +125,7 @@ const TranscriptionDashboard: React.FC<TranscriptionDashboardProps> = ({ newTask
       });
 
       // Inicia polling para a nova tarefa se ela estiver pendente ou processando
-      if (newTask.status === 'pending' || newTask.status === 'processing') {
+      if (newTask.status === 'extracting' || newTask.status === 'pending' || newTask.status === 'processing') {
         startPollingTask(newTask.task_id);
       }
     }
@@ -259,6 +259,7 @@ const TranscriptionDashboard: React.FC<TranscriptionDashboardProps> = ({ newTask
 
   const getStatusIcon = (status: TranscriptionStatus) => {
     switch (status) {
+      case 'extracting':
       case 'pending':
         return <Clock className="w-4 h-4 text-yellow-500" />;
       case 'processing':
@@ -272,6 +273,7 @@ const TranscriptionDashboard: React.FC<TranscriptionDashboardProps> = ({ newTask
 
   const getStatusText = (status: TranscriptionStatus) => {
     const statusMap = {
+      extracting: 'Extraindo áudio',
       pending: 'Pendente',
       processing: 'Processando',
       completed: 'Concluída',
@@ -282,6 +284,7 @@ const TranscriptionDashboard: React.FC<TranscriptionDashboardProps> = ({ newTask
 
   const getStatusColor = (status: TranscriptionStatus) => {
     switch (status) {
+      case 'extracting':
       case 'pending':
         return 'bg-yellow-100 text-yellow-800 border-yellow-200';
       case 'processing':
@@ -404,6 +407,7 @@ const TranscriptionDashboard: React.FC<TranscriptionDashboardProps> = ({ newTask
                 className="px-3 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500"
               >
                 <option value="all">Todos os status</option>
+                <option value="extracting">Extraindo áudio</option>
                 <option value="pending">Pendente</option>
                 <option value="processing">Processando</option>
                 <option value="completed">Concluída</option>
@@ -546,7 +550,7 @@ const TranscriptionDashboard: React.FC<TranscriptionDashboardProps> = ({ newTask
                           </button>
                         )}
 
-                        {(task.status === 'pending' || task.status === 'processing') && (
+                        {(task.status === 'extracting' || task.status === 'pending' || task.status === 'processing') && (
                           <>
                             <button
                               onClick={() => handleCancelTask(task)}
@@ -615,7 +619,7 @@ const TranscriptionDashboard: React.FC<TranscriptionDashboardProps> = ({ newTask
               </div>
               <div>
                 <div className="text-2xl font-bold text-yellow-600">
-                  {tasks.filter(t => t.status === 'pending').length}
+                  {tasks.filter(t => t.status === 'extracting' || t.status === 'pending').length}
                 </div>
                 <div className="text-sm text-gray-600">Pendentes</div>
               </div>
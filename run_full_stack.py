@@ -5,9 +5,13 @@ Executa o backend (FastAPI) e frontend (Next.js) em processos paralelos
 Usa ambiente virtual para o backend se disponível
 """
 
+import hashlib
 import os
+import queue
+import selectors
 import subprocess
 import sys
+import threading
 import time
 import signal
 from typing import List, Optional
@@ -58,17 +62,33 @@ def install_frontend_dependencies() -> bool:
     """Instala dependências do frontend se necessário"""
     frontend_dir = os.path.join(os.getcwd(), 'frontend')
     node_modules = os.path.join(frontend_dir, 'node_modules')
+    hash_file = os.path.join(node_modules, '.install_hash')
     
-    if not os.path.exists(node_modules):
-        print("📦 Instalando dependências do frontend...")
-        try:
-            subprocess.run(['npm', 'install'], cwd=frontend_dir, check=True)
-            print("✅ Dependências do frontend instaladas")
-            return True
-        except subprocess.CalledProcessError as e:
-            print(f"❌ Erro ao instalar dependências: {e}")
-            return False
-    return True
+    # Reinstala apenas se o lockfile mudou desde a última instalação
+    try:
+        with open(os.path.join(frontend_dir, 'package-lock.json'), 'rb') as f:
+            lock_hash = hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        with open(os.path.join(frontend_dir, 'package.json'), 'rb') as f:
+            lock_hash = hashlib.sha256(f.read()).hexdigest()
+    
+    try:
+        with open(hash_file) as f:
+            if f.read().strip() == lock_hash:
+                return True
+    except FileNotFoundError:
+        pass
+    
+    print("📦 Instalando dependências do frontend...")
+    try:
+        subprocess.run(['npm', 'install'], cwd=frontend_dir, check=True)
+        with open(hash_file, 'w') as f:
+            f.write(lock_hash)
+        print("✅ Dependências do frontend instaladas")
+        return True
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Erro ao instalar dependências: {e}")
+        return False
 
 def start_backend() -> subprocess.Popen:
     """Inicia o servidor FastAPI usando ambiente virtual se disponível"""
@@ -117,24 +137,67 @@ def start_frontend() -> subprocess.Popen:
         bufsize=1
     )
 
+def _first_exited(processes: List[subprocess.Popen], names: List[str]) -> Optional[str]:
+    """Retorna o nome do primeiro processo que terminou, se houver"""
+    for process, name in zip(processes, names):
+        if process.poll() is not None:
+            print(f"❌ {name} parou inesperadamente (código: {process.returncode})")
+            return name
+    return None
+
+def _monitor_with_selectors(processes: List[subprocess.Popen], names: List[str]):
+    """Espera pelos stdouts de todos os processos ao mesmo tempo"""
+    selector = selectors.DefaultSelector()
+    partial = {}
+    for process, name in zip(processes, names):
+        selector.register(process.stdout.fileno(), selectors.EVENT_READ, data=name)
+        partial[name] = b""
+    
+    while True:
+        events = selector.select(timeout=0.5)
+        for key, _ in events:
+            chunk = os.read(key.fd, 65536)
+            if not chunk:
+                # Última linha sem "\n" final
+                if partial[key.data].strip():
+                    print(f"[{key.data}] {partial[key.data].decode(errors='replace').strip()}")
+                partial[key.data] = b""
+                selector.unregister(key.fd)
+                if _first_exited(processes, names):
+                    return
+                continue
+            *lines, partial[key.data] = (partial[key.data] + chunk).split(b"\n")
+            for line in lines:
+                print(f"[{key.data}] {line.decode(errors='replace').strip()}")
+        if not events and _first_exited(processes, names):
+            return
+
+def _monitor_with_threads(processes: List[subprocess.Popen], names: List[str]):
+    """No Windows o select não aceita pipes: uma thread por processo alimenta uma fila"""
+    lines = queue.Queue()
+    
+    def pump(process: subprocess.Popen, name: str):
+        for line in process.stdout:
+            lines.put((name, line))
+    
+    for process, name in zip(processes, names):
+        threading.Thread(target=pump, args=(process, name), daemon=True).start()
+    
+    while True:
+        try:
+            name, line = lines.get(timeout=0.5)
+            print(f"[{name}] {line.strip()}")
+        except queue.Empty:
+            if _first_exited(processes, names):
+                return
+
 def monitor_processes(processes: List[subprocess.Popen], names: List[str]):
     """Monitora os processos e exibe logs"""
     try:
-        while True:
-            for i, (process, name) in enumerate(zip(processes, names)):
-                if process.poll() is not None:
-                    print(f"❌ {name} parou inesperadamente (código: {process.returncode})")
-                    return
-                
-                # Lê output não-bloqueante
-                try:
-                    line = process.stdout.readline()
-                    if line:
-                        print(f"[{name}] {line.strip()}")
-                except:
-                    pass
-            
-            time.sleep(0.1)
+        if sys.platform == "win32":
+            _monitor_with_threads(processes, names)
+        else:
+            _monitor_with_selectors(processes, names)
     except KeyboardInterrupt:
         print("\n⏹️  Parando aplicações...")
         for process, name in zip(processes, names):